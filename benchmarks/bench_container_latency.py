@@ -0,0 +1,96 @@
+"""
+Benchmark per-file AFNI latency with cold versus warm containers.
+
+Each "file" is one 3dWarp -deoblique plus one 3dresample call on a synthetic
+oblique T1w-sized image. The cold runner is niwrap's DockerRunner (a new
+container per call); the warm runner is WarmContainerRunner (one long-lived
+container, commands run with docker exec). The first warm file includes the
+container start and is reported separately. Requires Docker.
+
+Usage:
+    python benchmarks/bench_container_latency.py
+    python benchmarks/bench_container_latency.py --files 10 --shape 176 256 256
+"""
+import os
+import sys
+import argparse
+import statistics
+import tempfile
+import time
+
+import niwrap
+import nibabel as nib
+from styxdocker import DockerRunner
+import numpy as np
+from rich.console import Console
+from rich.table import Table
+from rich import box
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from niwrap_correct_headers import WarmContainerRunner, deoblique, reorient_to_orientation  # noqa: E402
+
+console = Console()
+
+
+def make_oblique_image(path, shape):
+    """Write a synthetic int16 image with a 10° oblique affine."""
+    rng = np.random.default_rng(0)
+    data = rng.integers(0, 1000, size=shape, dtype=np.int16)
+    affine = nib.affines.from_matvec(nib.eulerangles.euler2mat(np.radians(10), 0, 0), [-90.0, -120.0, -100.0])
+    nib.save(nib.Nifti1Image(data, affine), path)
+
+
+def time_files(input_path, work_dir, n_files, orientation):
+    """Per-file latencies (s) of deoblique + reorient with the current global runner."""
+    latencies = []
+    for index in range(n_files):
+        deobliqued = os.path.join(work_dir, f"deoblique_{index}.nii.gz")
+        reoriented = os.path.join(work_dir, f"final_{index}.nii.gz")
+        start = time.perf_counter()
+        deoblique(input_path, deobliqued)
+        reorient_to_orientation(deobliqued, reoriented, orientation)
+        latencies.append(time.perf_counter() - start)
+    return latencies
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--files", type=int, default=5, help="Files per runner (default: 5)")
+    parser.add_argument("--shape", type=int, nargs=3, default=[176, 256, 256],
+                        help="Shape of the synthetic image (default: 176 256 256)")
+    parser.add_argument("--orient", default="LPI", help="Target orientation (default: LPI)")
+    args = parser.parse_args()
+
+    table = Table(show_header=True, header_style="bold blue", box=box.ROUNDED)
+    table.add_column("Runner")
+    table.add_column("First file (s)", justify="right")
+    table.add_column("Median file (s)", justify="right")
+    table.add_column("Mean file (s)", justify="right")
+
+    with tempfile.TemporaryDirectory(prefix="bench_containers_") as temp_dir:
+        input_path = os.path.join(temp_dir, "input_T1w.nii.gz")
+        make_oblique_image(input_path, tuple(args.shape))
+
+        # 3dWarp receives plain host paths, so the cold runner mounts the work directory as well
+        runners = {
+            "cold (DockerRunner)": DockerRunner(docker_extra_args=["-v", f"{temp_dir}:{temp_dir}"]),
+            "warm (WarmContainerRunner)": WarmContainerRunner([temp_dir]),
+        }
+
+        for name, runner in runners.items():
+            niwrap.set_global_runner(runner)
+            work_dir = tempfile.mkdtemp(dir=temp_dir)
+            try:
+                latencies = time_files(input_path, work_dir, args.files, args.orient)
+            finally:
+                if isinstance(runner, WarmContainerRunner):
+                    runner.stop()
+            steady = latencies[1:] or latencies
+            table.add_row(name, f"{latencies[0]:.2f}", f"{statistics.median(steady):.2f}",
+                          f"{statistics.mean(steady):.2f}")
+
+    console.print(table)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,124 @@
+"""
+Benchmark the 4D→3D conversion step on synthetic 4D inputs.
+
+Compares the previous implementation (``get_fdata()[:, :, :, 0]``, which
+decompresses and upcasts every timepoint) against ``convert_4d_to_3d`` reading
+the first volume through the array proxy, both with scaled values and in the
+default dtype-preserving mode, and against the streaming header patch that
+never decodes voxel data. Each measurement runs in a fresh process so peak
+RSS is not polluted by earlier runs; the size of the written intermediate is
+reported alongside.
+
+Usage:
+    python benchmarks/bench_convert_4d_to_3d.py
+    python benchmarks/bench_convert_4d_to_3d.py --shape 256 256 176 --volumes 1 4 8
+"""
+import os
+import sys
+import argparse
+import resource
+import tempfile
+import time
+import concurrent.futures
+import multiprocessing as mp
+from functools import partial
+
+import nibabel as nib
+import numpy as np
+from rich.console import Console
+from rich.table import Table
+from rich import box
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from niwrap_correct_headers import convert_4d_to_3d, patch_header_streaming  # noqa: E402
+
+console = Console()
+
+
+def legacy_convert_4d_to_3d(input_image_path, output_image_path):
+    """The pre-proxy implementation, kept here as the baseline."""
+    img = nib.load(input_image_path)
+    if len(img.shape) == 4:
+        data_3d = img.get_fdata()[:, :, :, 0]
+    else:
+        data_3d = img.get_fdata()
+    hdr = img.header.copy()
+    hdr['dim'][0] = 3
+    hdr['dim'][4] = 1
+    hdr['pixdim'][4] = 1.0
+    nib.save(nib.Nifti1Image(data_3d, img.affine, hdr), output_image_path)
+
+
+IMPLEMENTATIONS = {
+    "legacy (get_fdata)": legacy_convert_4d_to_3d,
+    "proxy, scaled values": partial(convert_4d_to_3d, preserve_dtype=False),
+    "proxy, stored dtype": convert_4d_to_3d,
+    "streaming header patch": patch_header_streaming,
+}
+
+
+def make_4d_image(path, shape, n_volumes):
+    """Write a synthetic int16 4D image with a smooth intensity profile to ``path``."""
+    rng = np.random.default_rng(0)
+    grid = np.indices(shape, sparse=True)
+    profile = sum(np.sin(axis / 7.0) for axis in grid) * 600 + 2000
+    data = np.empty((*shape, n_volumes), dtype=np.int16)
+    for volume in range(n_volumes):
+        data[..., volume] = profile + rng.integers(0, 50, size=shape)
+    img = nib.Nifti1Image(data, np.diag([1.0, 1.0, 1.0, 1.0]))
+    img.header.set_data_dtype(np.int16)
+    img.header['pixdim'][4] = 2.0
+    nib.save(img, path)
+
+
+def _measure(name, input_path, output_path):
+    """Run one implementation; executed in a fresh worker process."""
+    baseline = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    start = time.perf_counter()
+    IMPLEMENTATIONS[name](input_path, output_path)
+    elapsed = time.perf_counter() - start
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is reported in KiB on Linux
+    return elapsed, max(peak - baseline, 0) / 1024
+
+
+def run_isolated(name, input_path, output_path):
+    ctx = mp.get_context("spawn")
+    with concurrent.futures.ProcessPoolExecutor(max_workers=1, mp_context=ctx) as executor:
+        return executor.submit(_measure, name, input_path, output_path).result()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--shape", type=int, nargs=3, default=[192, 256, 256],
+                        help="Spatial shape of the synthetic image (default: 192 256 256)")
+    parser.add_argument("--volumes", type=int, nargs="+", default=[1, 2, 4, 8],
+                        help="Number of volumes to benchmark (default: 1 2 4 8)")
+    parser.add_argument("--repeats", type=int, default=3,
+                        help="Runs per implementation; the best time is reported (default: 3)")
+    args = parser.parse_args()
+
+    table = Table(show_header=True, header_style="bold blue", box=box.ROUNDED)
+    table.add_column("Volumes", justify="right")
+    table.add_column("Implementation")
+    table.add_column("Best time (s)", justify="right")
+    table.add_column("Peak RSS delta (MiB)", justify="right")
+    table.add_column("Output size (MiB)", justify="right")
+
+    with tempfile.TemporaryDirectory(prefix="bench_4d_") as temp_dir:
+        for n_volumes in args.volumes:
+            input_path = os.path.join(temp_dir, f"in_{n_volumes}.nii.gz")
+            make_4d_image(input_path, tuple(args.shape), n_volumes)
+            for name in IMPLEMENTATIONS:
+                output_path = os.path.join(temp_dir, "out.nii.gz")
+                runs = [run_isolated(name, input_path, output_path) for _ in range(args.repeats)]
+                best_time = min(r[0] for r in runs)
+                peak_rss = max(r[1] for r in runs)
+                output_size = os.path.getsize(output_path) / 2**20
+                table.add_row(str(n_volumes), name, f"{best_time:.2f}", f"{peak_rss:.0f}", f"{output_size:.1f}")
+
+    console.print(table)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,124 @@
+"""
+Benchmark throughput across jobs × threads-per-job splits.
+
+Each split processes the same synthetic oblique T1w-sized images with
+``process_single_file`` in a pool of ``jobs`` workers, each capped at
+``threads`` OpenMP/BLAS threads (``--threads-per-job``). By default every
+split that uses all CPUs in the affinity mask is measured, plus the
+uncapped baseline (one job per CPU, library default threads). The native
+engines keep the work in-process; ``--engine afni`` measures AFNI through
+``--runner`` instead.
+
+Usage:
+    python benchmarks/bench_threads.py
+    python benchmarks/bench_threads.py --splits 8x1 4x2 2x4 --files 32
+    python benchmarks/bench_threads.py --engine afni --runner local
+"""
+import os
+import sys
+import argparse
+import tempfile
+import time
+import concurrent.futures
+from functools import partial
+
+import nibabel as nib
+import numpy as np
+from rich.console import Console
+from rich.table import Table
+from rich import box
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from niwrap_correct_headers import (  # noqa: E402
+    RUNNERS,
+    init_worker,
+    process_single_file,
+    thread_environment,
+)
+
+console = Console()
+
+
+def make_oblique_inputs(directory, n_files, shape):
+    """Write n_files int16 images with a 10° oblique affine in LPS orientation."""
+    rng = np.random.default_rng(0)
+    affine = nib.affines.from_matvec(nib.eulerangles.euler2mat(np.radians(10), 0, 0) @ np.diag([-1.0, -1.0, 1.0]),
+                                     [90.0, 120.0, -100.0])
+    paths = []
+    for index in range(n_files):
+        path = os.path.join(directory, f"sub-{index:03d}_T1w.nii.gz")
+        nib.save(nib.Nifti1Image(rng.integers(0, 1000, size=shape, dtype=np.int16), affine), path)
+        paths.append(path)
+    return paths
+
+
+def parse_split(text):
+    jobs, _, threads = text.partition("x")
+    if not (jobs.isdigit() and (threads.isdigit() or threads == "")):
+        raise argparse.ArgumentTypeError(f"Invalid split '{text}', expected JOBSxTHREADS such as 4x2")
+    return int(jobs), int(threads) if threads else None
+
+
+def default_splits():
+    """Every jobs × threads split of the available CPUs, plus the uncapped baseline."""
+    cpus = len(os.sched_getaffinity(0)) if hasattr(os, "sched_getaffinity") else os.cpu_count() or 1
+    return [(cpus, None)] + [(cpus // threads, threads) for threads in range(1, cpus + 1) if cpus % threads == 0]
+
+
+def run_split(inputs, output_dir, jobs, threads, engine, runner):
+    """Wall time (s) of processing inputs with one split."""
+    environ = thread_environment(threads) if threads else None
+    runner_config = (runner, [os.path.dirname(inputs[0]), output_dir, tempfile.gettempdir()], False, environ)
+    process_func = partial(process_single_file, output_dir=output_dir, orientation="RAS",
+                           reorient_engine=engine, deoblique_engine=engine)
+    with concurrent.futures.ProcessPoolExecutor(max_workers=jobs, initializer=init_worker,
+                                                initargs=(runner_config, threads)) as executor:
+        # Start the workers (and run their initializers) before timing
+        list(executor.map(abs, range(2 * jobs)))
+        start = time.perf_counter()
+        results = list(executor.map(process_func, inputs))
+        elapsed = time.perf_counter() - start
+    failures = [r for r in results if r["status"] != "success"]
+    if failures:
+        raise RuntimeError(f"{len(failures)} files failed, e.g. {failures[0]['error']}")
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--splits", type=parse_split, nargs="+",
+                        help="JOBSxTHREADS splits to measure; JOBS alone leaves threads uncapped "
+                             "(default: every split of the available CPUs)")
+    parser.add_argument("--files", type=int, default=16, help="Images per split (default: 16)")
+    parser.add_argument("--shape", type=int, nargs=3, default=[176, 256, 256],
+                        help="Shape of the synthetic images (default: 176 256 256)")
+    parser.add_argument("--engine", choices=["native", "afni"], default="native",
+                        help="Deoblique/reorient engine (default: native)")
+    parser.add_argument("--runner", choices=RUNNERS, default="docker",
+                        help="AFNI runner with --engine afni (default: docker)")
+    args = parser.parse_args()
+
+    table = Table(show_header=True, header_style="bold blue", box=box.ROUNDED)
+    table.add_column("Jobs", justify="right")
+    table.add_column("Threads/job", justify="right")
+    table.add_column("Time (s)", justify="right")
+    table.add_column("Files/s", justify="right")
+    table.add_column("MB/s", justify="right")
+
+    with tempfile.TemporaryDirectory(prefix="bench_threads_") as temp_dir:
+        input_dir = os.path.join(temp_dir, "inputs")
+        os.makedirs(input_dir)
+        inputs = make_oblique_inputs(input_dir, args.files, tuple(args.shape))
+        megabytes = sum(os.path.getsize(path) for path in inputs) / 1e6
+
+        for jobs, threads in args.splits or default_splits():
+            output_dir = tempfile.mkdtemp(dir=temp_dir)
+            elapsed = run_split(inputs, output_dir, jobs, threads, args.engine, args.runner)
+            table.add_row(str(jobs), str(threads) if threads else "default", f"{elapsed:.2f}",
+                          f"{len(inputs) / elapsed:.2f}", f"{megabytes / elapsed:.1f}")
+
+    console.print(table)
+
+
+if __name__ == "__main__":
+    main()
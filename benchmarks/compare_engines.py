@@ -0,0 +1,202 @@
+"""
+Check the native engines against their AFNI counterparts.
+
+Reorientation: for each requested target orientation, the input images are
+reoriented with both AFNI 3dresample and ``reorient_native``; the voxel data
+and affines of the two outputs must agree exactly.
+
+Deobliquing: oblique inputs are deobliqued with both AFNI 3dWarp and
+``deoblique_native`` for each interpolation method; the affines must agree and
+the RMS voxel difference, relative to the intensity range, must stay within
+``--value-tolerance``.
+
+Requires AFNI to be reachable through niwrap.
+
+Usage:
+    python benchmarks/compare_engines.py
+    python benchmarks/compare_engines.py --stage reorient --orientations LPI RAS --inputs sub-01_T1w.nii.gz
+    python benchmarks/compare_engines.py --stage deoblique --interpolations linear cubic
+"""
+import os
+import sys
+import argparse
+import tempfile
+
+import nibabel as nib
+import numpy as np
+from rich.console import Console
+from rich.table import Table
+from rich import box
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from niwrap_correct_headers import (  # noqa: E402
+    INTERPOLATIONS,
+    deoblique,
+    deoblique_native,
+    is_oblique,
+    reorient_to_orientation,
+    reorient_native,
+    validate_orientation,
+)
+
+console = Console()
+
+ALL_ORIENTATIONS = [
+    "RPI", "LPI", "RAI", "LAI", "RPS", "LPS", "RAS", "LAS",
+    "IPR", "IPL", "IAR", "IAL", "SPR", "SPL", "SAR", "SAL",
+    "PIR", "PIL", "AIR", "AIL", "PSR", "PSL", "ASR", "ASL",
+]
+
+# Voxel-to-world matrices of the synthetic inputs: one per starting orientation class
+SYNTHETIC_AFFINES = {
+    "RAS": np.diag([1.0, 1.1, 1.2, 1.0]),
+    "LPS": np.diag([-1.0, -1.1, 1.2, 1.0]),
+    "ASL": np.array([[0, 0, -1.2, 90], [1.0, 0, 0, -100], [0, 1.1, 0, -60], [0, 0, 0, 1]]),
+}
+
+
+# Rotations (degrees about x, y, z) of the synthetic oblique inputs
+SYNTHETIC_ROTATIONS = {
+    "small": (2.0, -1.0, 0.5),
+    "moderate": (12.0, 5.0, -8.0),
+}
+
+
+def smooth_volume(shape, seed=0):
+    """Smooth int16 test volume: a blurred ellipsoid with low-amplitude texture."""
+    rng = np.random.default_rng(seed)
+    grid = np.indices(shape, dtype=np.float32)
+    centre = (np.array(shape, dtype=np.float32) - 1)[:, None, None, None] / 2
+    radius = np.sqrt((((grid - centre) / (0.4 * np.array(shape)[:, None, None, None])) ** 2).sum(axis=0))
+    volume = 800 / (1 + np.exp((radius - 1) * 12)) + 50 * np.sin(grid[0] / 3) * np.cos(grid[1] / 4)
+    return (volume + rng.normal(0, 5, size=shape)).astype(np.int16)
+
+
+def make_synthetic_inputs(directory, shape=(40, 48, 36)):
+    """Write small int16 images with distinct starting orientations."""
+    rng = np.random.default_rng(0)
+    data = rng.integers(0, 1000, size=shape, dtype=np.int16)
+    paths = []
+    for name, affine in SYNTHETIC_AFFINES.items():
+        path = os.path.join(directory, f"synthetic_{name}.nii.gz")
+        nib.save(nib.Nifti1Image(data, affine), path)
+        paths.append(path)
+    return paths
+
+
+def make_oblique_inputs(directory, shape=(64, 72, 56)):
+    """Write smooth int16 images with oblique affines."""
+    data = smooth_volume(shape)
+    paths = []
+    for name, angles in SYNTHETIC_ROTATIONS.items():
+        rotation = nib.eulerangles.euler2mat(*np.radians(angles)[::-1])
+        affine = nib.affines.from_matvec(rotation @ np.diag([1.0, 1.0, 1.2]), [-32.0, -36.0, -30.0])
+        path = os.path.join(directory, f"oblique_{name}.nii.gz")
+        nib.save(nib.Nifti1Image(data, affine), path)
+        paths.append(path)
+    return paths
+
+
+def compare_outputs(afni_path, native_path):
+    """
+    Return (max voxel difference, relative RMS difference, max affine difference)
+    between two images.
+    """
+    afni_img = nib.load(afni_path)
+    native_img = nib.load(native_path)
+    if afni_img.shape[:3] != native_img.shape[:3]:
+        return float("inf"), float("inf"), float("inf")
+    afni_data = afni_img.get_fdata().squeeze()
+    diff = afni_data - native_img.get_fdata().squeeze()
+    value_range = max(float(np.ptp(afni_data)), 1e-12)
+    rel_rms = float(np.sqrt(np.mean(diff ** 2)) / value_range)
+    affine_diff = np.abs(afni_img.affine - native_img.affine).max()
+    return float(np.abs(diff).max()), rel_rms, float(affine_diff)
+
+
+def results_table(*columns):
+    table = Table(show_header=True, header_style="bold blue", box=box.ROUNDED)
+    for column in columns:
+        table.add_column(column, justify="left" if column == "Input" else "right")
+    return table
+
+
+def compare_reorient(inputs, orientations, temp_dir, affine_tolerance):
+    """Compare 3dresample and reorient_native; returns (table, failures)."""
+    table = results_table("Input", "Target", "Max voxel diff", "Max affine diff", "Match")
+    failures = 0
+    for input_path in inputs:
+        for orientation in orientations:
+            afni_path = os.path.join(temp_dir, f"afni_{orientation}.nii.gz")
+            native_path = os.path.join(temp_dir, f"native_{orientation}.nii.gz")
+            reorient_to_orientation(input_path, afni_path, orientation)
+            reorient_native(input_path, native_path, orientation)
+            voxel_diff, _, affine_diff = compare_outputs(afni_path, native_path)
+            match = voxel_diff == 0 and affine_diff <= affine_tolerance
+            failures += not match
+            table.add_row(os.path.basename(input_path), orientation, f"{voxel_diff:g}",
+                          f"{affine_diff:.2e}", "✅" if match else "❌")
+    return table, failures
+
+
+def compare_deoblique(inputs, interpolations, temp_dir, affine_tolerance, value_tolerance):
+    """Compare 3dWarp -deoblique and deoblique_native; returns (table, failures)."""
+    table = results_table("Input", "Interpolation", "Max voxel diff", "Relative RMS diff",
+                          "Max affine diff", "Match")
+    failures = 0
+    for input_path in inputs:
+        if not is_oblique(nib.load(input_path).affine):
+            console.print(f"[yellow]Skipping {os.path.basename(input_path)}: not oblique[/yellow]")
+            continue
+        for interpolation in interpolations:
+            afni_path = os.path.join(temp_dir, f"afni_{interpolation}.nii.gz")
+            native_path = os.path.join(temp_dir, f"native_{interpolation}.nii.gz")
+            deoblique(input_path, afni_path, interpolation)
+            deoblique_native(input_path, native_path, interpolation)
+            voxel_diff, rel_rms, affine_diff = compare_outputs(afni_path, native_path)
+            match = affine_diff <= affine_tolerance and rel_rms <= value_tolerance
+            failures += not match
+            table.add_row(os.path.basename(input_path), interpolation, f"{voxel_diff:g}",
+                          f"{rel_rms:.2e}", f"{affine_diff:.2e}", "✅" if match else "❌")
+    return table, failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--stage", choices=["reorient", "deoblique", "all"], default="all",
+                        help="Which engines to compare (default: all)")
+    parser.add_argument("--inputs", nargs="+",
+                        help="Images to compare on (default: synthetic images per stage)")
+    parser.add_argument("--orientations", nargs="+", type=validate_orientation, default=ALL_ORIENTATIONS,
+                        help="Target orientations to check (default: all 24)")
+    parser.add_argument("--interpolations", nargs="+", choices=INTERPOLATIONS, default=INTERPOLATIONS,
+                        help="Deoblique interpolation methods to check (default: all)")
+    parser.add_argument("--affine-tolerance", type=float, default=1e-3,
+                        help="Largest allowed affine difference in mm (default: 1e-3)")
+    parser.add_argument("--value-tolerance", type=float, default=0.01,
+                        help="Largest allowed deoblique RMS difference relative to the intensity range "
+                             "(default: 0.01)")
+    args = parser.parse_args()
+
+    failures = 0
+    with tempfile.TemporaryDirectory(prefix="compare_engines_") as temp_dir:
+        if args.stage in ("reorient", "all"):
+            inputs = args.inputs or make_synthetic_inputs(temp_dir)
+            table, stage_failures = compare_reorient(inputs, args.orientations, temp_dir,
+                                                     args.affine_tolerance)
+            console.print(table)
+            failures += stage_failures
+        if args.stage in ("deoblique", "all"):
+            inputs = args.inputs or make_oblique_inputs(temp_dir)
+            table, stage_failures = compare_deoblique(inputs, args.interpolations, temp_dir,
+                                                      args.affine_tolerance, args.value_tolerance)
+            console.print(table)
+            failures += stage_failures
+
+    if failures:
+        console.print(f"[red]{failures} comparisons did not match[/red]")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
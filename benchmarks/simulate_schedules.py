@@ -0,0 +1,107 @@
+"""
+Simulate the makespan of each --schedule policy on a synthetic dataset.
+
+First-volume sizes follow a log-normal distribution of T1w scans with a small
+share of high-resolution scans, and some files are multi-volume stacks. Only
+the first volume is ever read, so each file takes time proportional to its
+first-volume size plus a fixed per-file overhead, whatever its volume count.
+Files are handed to the first free of ``--workers`` workers in the order
+produced by ``schedule_files`` (as the bounded submission does), and the
+resulting makespan is compared with the lower bound max(total work / workers,
+largest file). For contrast, largest-first is also run on the size on disk,
+which 4D stacks inflate. Nothing is processed.
+
+Usage:
+    python benchmarks/simulate_schedules.py
+    python benchmarks/simulate_schedules.py --workers 32 --files 5000 --highres-fraction 0.01
+"""
+import os
+import sys
+import argparse
+import heapq
+
+import numpy as np
+from rich.console import Console
+from rich.table import Table
+from rich import box
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from niwrap_correct_headers import SCHEDULES, schedule_files  # noqa: E402
+
+console = Console()
+
+
+# Compressed size on disk relative to the uncompressed volumes
+COMPRESSION_RATIO = 0.5
+
+
+def synthetic_dataset(n_files, highres_fraction, multi_volume_fraction, seed=0):
+    """
+    Maps of BIDS-like paths to first-volume MB (uncompressed) and to MB on disk, in
+    a shuffled discovery order.
+    """
+    rng = np.random.default_rng(seed)
+    first_volume = rng.lognormal(mean=np.log(24), sigma=0.35, size=n_files)
+    highres = rng.random(n_files) < highres_fraction
+    first_volume[highres] *= rng.uniform(3, 8, size=highres.sum())
+    volumes = np.where(rng.random(n_files) < multi_volume_fraction, rng.integers(2, 40, size=n_files), 1)
+    on_disk = first_volume * volumes * COMPRESSION_RATIO
+    paths = [f"/data/sub-{index // 2:04d}/ses-{index % 2 + 1}/anat/sub-{index // 2:04d}_T1w.nii.gz"
+             for index in range(n_files)]
+    order = rng.permutation(n_files)
+    return ({paths[index]: float(first_volume[index]) for index in order},
+            {paths[index]: float(on_disk[index]) for index in order})
+
+
+def makespan(durations, workers):
+    """Finish time of greedy list scheduling: each task goes to the first free worker."""
+    free_at = [0.0] * workers
+    for duration in durations:
+        heapq.heappush(free_at, heapq.heappop(free_at) + duration)
+    return max(free_at)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, default=16, help="Parallel workers (default: 16)")
+    parser.add_argument("--files", type=int, default=1000, help="Files in the dataset (default: 1000)")
+    parser.add_argument("--highres-fraction", type=float, default=0.02,
+                        help="Share of high-resolution scans, 3-8× the voxels (default: 0.02)")
+    parser.add_argument("--multi-volume-fraction", type=float, default=0.05,
+                        help="Share of multi-volume (4D) files (default: 0.05)")
+    parser.add_argument("--seconds-per-mb", type=float, default=0.25,
+                        help="Processing time per MB of the first volume (default: 0.25)")
+    parser.add_argument("--overhead", type=float, default=2.0,
+                        help="Fixed seconds per file, e.g. container start-up (default: 2.0)")
+    parser.add_argument("--seeds", type=int, default=5, help="Datasets to average over (default: 5)")
+    args = parser.parse_args()
+
+    on_disk_label = "largest-first (size on disk)"
+    results = {schedule: [] for schedule in SCHEDULES + [on_disk_label]}
+    bounds = []
+    for seed in range(args.seeds):
+        first_volume, on_disk = synthetic_dataset(args.files, args.highres_fraction, args.multi_volume_fraction,
+                                                  seed)
+        duration = {path: args.overhead + size * args.seconds_per_mb for path, size in first_volume.items()}
+        bounds.append(max(sum(duration.values()) / args.workers, max(duration.values())))
+        for schedule in SCHEDULES:
+            order = schedule_files(list(first_volume), schedule, work=first_volume.__getitem__)
+            results[schedule].append(makespan([duration[path] for path in order], args.workers))
+        order = schedule_files(list(on_disk), "largest-first", work=on_disk.__getitem__)
+        results[on_disk_label].append(makespan([duration[path] for path in order], args.workers))
+
+    table = Table(show_header=True, header_style="bold blue", box=box.ROUNDED,
+                  title=f"{args.files} files, {args.workers} workers, mean of {args.seeds} datasets")
+    table.add_column("Schedule")
+    table.add_column("Makespan (s)", justify="right")
+    table.add_column("vs lower bound", justify="right")
+    bound = float(np.mean(bounds))
+    table.add_row("lower bound", f"{bound:.0f}", "1.00×")
+    for schedule, spans in results.items():
+        span = float(np.mean(spans))
+        table.add_row(schedule, f"{span:.0f}", f"{span / bound:.2f}×")
+    console.print(table)
+
+
+if __name__ == "__main__":
+    main()
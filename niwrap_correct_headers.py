@@ -1,3 +1,4 @@
+import niwrap
 from niwrap import afni
 import os
 import glob
@@ -5,6 +6,7 @@ import argparse
 import multiprocessing as mp
 from functools import partial
 import tempfile
+import pathlib
 import uuid
 import shutil
 from rich.console import Console
@@ -16,25 +18,231 @@ from rich import box
 from rich.prompt import Confirm
 import time
 import concurrent.futures
+import itertools
+import threading
 import nibabel as nib
+import numpy as np
+from collections import Counter, deque
+import mmap
+import sqlite3
+import hashlib
+import json
+import fnmatch
+import subprocess
+import shlex
+import re
+import statistics
+import sys
+import signal
+import importlib
 
 console = Console()
 
-def convert_4d_to_3d(input_image_path, output_image_path):
+# Display names for the per-file pipeline stages, in processing order
+STAGE_LABELS = {
+    "4d_to_3d": "4D→3D fix",
+    "deoblique": "Deoblique",
+    "reorient": "Reorient",
+}
+
+# Default obliquity (degrees) at or below which deobliquing is skipped
+OBLIQUE_TOLERANCE_DEG = 0.01
+
+def read_header(image_path):
+    """
+    Read only the NIfTI header (348 bytes plus any extensions) without touching voxel data.
+    """
+    with nib.openers.ImageOpener(image_path) as fileobj:
+        return nib.Nifti1Header.from_fileobj(fileobj)
+
+def needs_4d_to_3d(hdr):
+    """
+    Whether the header still needs the dim0/pixdim[4] correction.
+    """
+    return not (hdr['dim'][0] == 3 and hdr['pixdim'][4] == 1.0)
+
+def afni_to_axcodes(orientation):
+    """
+    Convert an AFNI orientation code to nibabel axis codes.
+
+    AFNI names the side each axis starts from (LPI: x runs left→right), while
+    nibabel names the side it points to, so LPI in AFNI is RAS in nibabel.
+    """
+    opposite = {"L": "R", "R": "L", "A": "P", "P": "A", "I": "S", "S": "I"}
+    return tuple(opposite[axis] for axis in orientation)
+
+def has_orientation(hdr, orientation):
+    """
+    Whether the header's voxel axes already follow the AFNI orientation code.
+    """
+    return nib.aff2axcodes(hdr.get_best_affine()) == afni_to_axcodes(orientation)
+
+def obliquity_degrees(affine):
+    """
+    Largest angle (degrees) between a voxel axis of the affine and its nearest world axis.
+    """
+    axes = affine[:3, :3] / np.linalg.norm(affine[:3, :3], axis=0)
+    cosines = np.clip(np.abs(axes).max(axis=0), 0.0, 1.0)
+    return float(np.degrees(np.arccos(cosines)).max())
+
+def is_oblique(affine, tolerance=OBLIQUE_TOLERANCE_DEG):
+    """
+    Whether the affine is oblique by more than tolerance degrees.
+    """
+    return obliquity_degrees(affine) > tolerance
+
+def plan_stages(hdr, orientation, oblique_tolerance=OBLIQUE_TOLERANCE_DEG):
+    """
+    Decide from the header alone which pipeline stages a file needs.
+
+    Returns the needed stage keys (see STAGE_LABELS) in processing order.
+    """
+    affine = hdr.get_best_affine()
+    stages = []
+    if needs_4d_to_3d(hdr):
+        stages.append("4d_to_3d")
+    if is_oblique(affine, oblique_tolerance):
+        stages.append("deoblique")
+    # 3dWarp -deoblique keeps the nearest cardinal axes, so the orientation is predictable
+    if not has_orientation(hdr, orientation):
+        stages.append("reorient")
+    return stages
+
+def volume_info(hdr):
+    """
+    (voxels, bytes per voxel) of an image's first volume, from its header.
+    """
+    return int(np.prod(hdr.get_data_shape()[:3], dtype=np.int64)), hdr.get_data_dtype().itemsize
+
+def plan_file(input_image_path, orientation, oblique_tolerance=OBLIQUE_TOLERANCE_DEG, volumes=None):
+    """
+    Plan a single file from its header; unreadable files are planned for every stage
+    so that the error surfaces during processing. volumes, when given, receives the
+    file's volume_info from the same header.
+    """
+    try:
+        hdr = read_header(input_image_path)
+        if volumes is not None:
+            volumes[input_image_path] = volume_info(hdr)
+        return plan_stages(hdr, orientation, oblique_tolerance)
+    except Exception:
+        return list(STAGE_LABELS)
+
+def triage_files(t1w_files, orientation, n_jobs, oblique_tolerance=OBLIQUE_TOLERANCE_DEG, volumes=None):
+    """
+    Read the headers of all files in parallel and plan the minimal work for each.
+
+    Returns a dict mapping each file to its list of needed stages. volumes, when
+    given, receives the volume_info of each readable file for scheduling and
+    memory estimates, so the headers are not read again.
+    """
+    plan_func = partial(plan_file, orientation=orientation, oblique_tolerance=oblique_tolerance, volumes=volumes)
+    with concurrent.futures.ThreadPoolExecutor(max_workers=n_jobs) as executor:
+        plans = executor.map(plan_func, t1w_files)
+        return dict(zip(t1w_files, plans))
+
+def hash_files(paths, n_jobs, digests):
+    """
+    Add the SHA-256 of every file not yet in digests to it, hashing in parallel
+    (None for unreadable files). Returns digests.
+    """
+    paths = [file_path for file_path in dict.fromkeys(paths) if file_path not in digests]
+    
+    def digest(file_path):
+        try:
+            return file_sha256(file_path)
+        except OSError:
+            return None
+    
+    with concurrent.futures.ThreadPoolExecutor(max_workers=n_jobs) as executor:
+        digests.update(zip(paths, executor.map(digest, paths)))
+    return digests
+
+def group_duplicates(t1w_files, n_jobs, digests=None):
+    """
+    Find byte-identical files: only files sharing a size are hashed, in parallel.
+
+    Returns the files with one representative per content, in discovery order,
+    and a dict mapping each representative to its identical copies. The digests
+    are added to digests, when given, for reuse (see hash_files).
+    """
+    by_size = {}
+    for file_path in t1w_files:
+        try:
+            by_size.setdefault(os.path.getsize(file_path), []).append(file_path)
+        except OSError:
+            pass
+    candidates = [file_path for paths in by_size.values() if len(paths) > 1 for file_path in paths]
+    digests = hash_files(candidates, n_jobs, {} if digests is None else digests)
+    representatives = {}
+    unique, duplicates = [], {}
+    for file_path in t1w_files:
+        content = digests.get(file_path)
+        if content is not None and content in representatives:
+            duplicates.setdefault(representatives[content], []).append(file_path)
+            continue
+        if content is not None:
+            representatives[content] = file_path
+        unique.append(file_path)
+    return unique, duplicates
+
+# Bytes per point of resample_to_grid's per-slab temporaries (coordinates, indices, weights)
+RESAMPLE_SLAB_BYTES_PER_VOXEL = 80
+
+def estimate_memory(volume, stages, header_mode="stream", preserve_dtype=True, reorient_engine="afni",
+                    deoblique_engine="afni"):
+    """
+    Rough peak memory in bytes of processing one file, from its volume_info.
+
+    Stages run one after another, so this is the need of the hungriest stage. Only
+    the first volume is ever decoded, so extra volumes cost nothing: the streaming
+    header patch holds one chunk, a rebuild the first volume and its copy, native
+    deobliquing the volume plus float32 working copies and AFNI (3dWarp/3dresample)
+    or native reorientation the input and output volume.
+    """
+    voxels, itemsize = volume
+    needs = [STREAM_CHUNK_SIZE]
+    if "4d_to_3d" in stages and header_mode == "rebuild":
+        needs.append(voxels * (itemsize if preserve_dtype else 8) * 2)
+    if "deoblique" in stages and deoblique_engine == "native":
+        needs.append(voxels * (2 * itemsize + 8) + min(voxels, RESAMPLE_SLAB_VOXELS) * RESAMPLE_SLAB_BYTES_PER_VOXEL)
+    elif "deoblique" in stages:
+        needs.append(voxels * (itemsize + 4) * 2)
+    if "reorient" in stages:
+        needs.append(voxels * itemsize * 2 if reorient_engine == "native" else voxels * (itemsize + 4) * 2)
+    return max(needs)
+
+def read_first_volume(img, preserve_dtype=True):
+    """
+    Read the first volume of an image through its array proxy.
+
+    With preserve_dtype, the raw stored values are returned in the on-disk dtype
+    (scl_slope/scl_inter not applied); otherwise the scaled values are returned.
+    """
+    proxy = img.dataobj
+    slicer = (Ellipsis, 0) if len(img.shape) == 4 else (Ellipsis,)
+    if preserve_dtype:
+        # Same file layout as the image's proxy, but with identity scaling
+        proxy = nib.arrayproxy.ArrayProxy(
+            img.get_filename(), (proxy.shape, proxy.dtype, proxy.offset, 1.0, 0.0), order=proxy.order
+        )
+    # The first volume is contiguous on disk, so gzip decompression stops after its last byte
+    return np.asanyarray(proxy[slicer])
+
+def convert_4d_to_3d(input_image_path, output_image_path, preserve_dtype=True):
     """
     Convert a 4D NIfTI image to a 3D NIfTI image by extracting the first volume using nibabel only.
     This preserves image quality without any resampling.
+
+    By default the stored values and their scl_slope/scl_inter are written back
+    unchanged; with preserve_dtype=False the scaled values are written and nibabel
+    recomputes the scaling for the on-disk dtype.
     """
-    # Load the 4D image
+    # Load the 4D image (header only, voxel data stays behind the array proxy)
     img = nib.load(input_image_path)
     
     # Extract first volume (3D)
-    if len(img.shape) == 4:
-        # Extract first timepoint
-        data_3d = img.get_fdata()[:, :, :, 0]
-    else:
-        # Already 3D, just copy
-        data_3d = img.get_fdata()
+    data_3d = read_first_volume(img, preserve_dtype)
     
     # Update header for 3D
     hdr = img.header.copy()
@@ -44,56 +252,1049 @@ def convert_4d_to_3d(input_image_path, output_image_path):
     
     # Create new 3D image with corrected header
     img_3d = nib.Nifti1Image(data_3d, img.affine, hdr)
+    if preserve_dtype:
+        # Keep the original scaling for the raw values (nibabel resets it on load)
+        img_3d.header.set_slope_inter(img.dataobj.slope, img.dataobj.inter)
     
     # Save the 3D image
     nib.save(img_3d, output_image_path)
 
-def deoblique(input_image_path, output_image_path):
+# Size of the NIfTI-1 header and of the chunks used when streaming voxel data
+NIFTI1_HEADER_SIZE = 348
+STREAM_CHUNK_SIZE = 1024 * 1024
+
+def _patched_header_block(block):
+    """
+    Apply the dim0/dim[4]/pixdim[4] correction to a raw NIfTI-1 header block.
+
+    Returns the patched 348 bytes (in the original byte order) and the number of
+    bytes from the start of the file to the end of the first volume.
+    """
+    hdr = nib.Nifti1Header(block[:NIFTI1_HEADER_SIZE], check=False)
+    if hdr['sizeof_hdr'] != NIFTI1_HEADER_SIZE:
+        raise ValueError("Streaming header patch only supports single-file NIfTI-1 images")
+    n_voxels = int(np.prod(hdr['dim'][1:4], dtype=np.int64))
+    first_volume_end = int(hdr['vox_offset']) + n_voxels * hdr.get_data_dtype().itemsize
+    hdr['dim'][0] = 3        # Set number of dimensions to 3
+    hdr['dim'][4] = 1        # Set time dimension to 1
+    hdr['pixdim'][4] = 1.0   # Set time dimension voxel size to 1
+    return hdr.binaryblock, first_volume_end
+
+def patch_header_inplace(image_path):
+    """
+    Patch dim0/dim[4]/pixdim[4] of an uncompressed .nii file in place through mmap.
+    Volumes after the first are truncated away, matching convert_4d_to_3d.
+    """
+    with open(image_path, "r+b") as f:
+        with mmap.mmap(f.fileno(), 0) as mm:
+            block, first_volume_end = _patched_header_block(mm[:NIFTI1_HEADER_SIZE])
+            mm[:NIFTI1_HEADER_SIZE] = block
+            mm.flush()
+        if os.fstat(f.fileno()).st_size > first_volume_end:
+            f.truncate(first_volume_end)
+
+def patch_header_streaming(input_image_path, output_image_path):
+    """
+    Correct dim0/dim[4]/pixdim[4] without decoding voxel data.
+
+    The input is decompressed, patched and recompressed chunk by chunk, so memory
+    stays flat regardless of image size; only the bytes up to the end of the first
+    volume are copied. Uncompressed .nii files are copied and patched through mmap,
+    or patched in place when input and output are the same file.
+    """
+    if not input_image_path.endswith(".gz") and not output_image_path.endswith(".gz"):
+        if os.path.abspath(input_image_path) != os.path.abspath(output_image_path):
+            shutil.copyfile(input_image_path, output_image_path)
+        patch_header_inplace(output_image_path)
+        return
+    
+    with nib.openers.ImageOpener(input_image_path) as src, \
+            nib.openers.ImageOpener(output_image_path, "wb") as dst:
+        block, remaining = _patched_header_block(src.read(NIFTI1_HEADER_SIZE))
+        dst.write(block)
+        remaining -= NIFTI1_HEADER_SIZE
+        while remaining > 0:
+            chunk = src.read(min(STREAM_CHUNK_SIZE, remaining))
+            if not chunk:
+                raise ValueError(f"Unexpected end of file in {input_image_path}")
+            dst.write(chunk)
+            remaining -= len(chunk)
+
+# Interpolation methods shared by both deoblique engines (names follow the 3dWarp flags)
+INTERPOLATIONS = ["nn", "linear", "cubic"]
+
+# Number of output voxels resampled per slab by the native deoblique engine
+RESAMPLE_SLAB_VOXELS = 1 << 20
+
+def deoblique_params(input_image_path, output_image_path, interpolation="linear"):
+    """
+    niwrap parameters of the 3dWarp call that deobliques an image onto its own grid.
+    Paths are made absolute: niwrap passes them through unmapped and runs AFNI from
+    its own scratch directory (or the container's).
+    """
+    input_image_path, output_image_path = os.path.abspath(input_image_path), os.path.abspath(output_image_path)
+    return afni.v_3d_warp_params(dataset=input_image_path, gridset=input_image_path, prefix=output_image_path,
+                                 deoblique=True, **{interpolation: True})
+
+def deoblique(input_image_path, output_image_path, interpolation="linear"):
     """
     Deoblique a NIfTI image using AFNI's 3dWarp.
     """
-    afni.v_3d_warp(dataset=input_image_path, gridset=input_image_path, prefix=output_image_path, deoblique=True)
+    afni.v_3d_warp_execute(deoblique_params(input_image_path, output_image_path, interpolation))
+
+def cardinal_affine(affine):
+    """
+    Cardinal grid that 3dWarp -deoblique resamples onto.
+
+    Each voxel axis is snapped to its nearest world axis (keeping its direction and
+    voxel size), and the first voxel keeps its world position.
+    """
+    zooms = np.linalg.norm(affine[:3, :3], axis=0)
+    cardinal = np.eye(4)
+    cardinal[:3, 3] = affine[:3, 3]
+    cardinal[:3, :3] = 0.0
+    for axis, world_axis in enumerate(nib.orientations.io_orientation(affine)):
+        cardinal[int(world_axis[0]), axis] = world_axis[1] * zooms[axis]
+    return cardinal
+
+def _interpolation_weights(frac, interpolation):
+    """
+    Tap offsets and per-point weights (taps × points) along one axis.
+    """
+    if interpolation == "linear":
+        return [0, 1], [1.0 - frac, frac]
+    # Four-point Lagrange cubic, as used by AFNI
+    return [-1, 0, 1, 2], [
+        -frac * (frac - 1) * (frac - 2) / 6,
+        (frac + 1) * (frac - 1) * (frac - 2) / 2,
+        -(frac + 1) * frac * (frac - 2) / 2,
+        (frac + 1) * frac * (frac - 1) / 6,
+    ]
+
+def resample_to_grid(data, source_affine, target_affine, interpolation="linear", shape=None):
+    """
+    Resample a 3D array onto a target grid (by default of the same shape) with vectorized NumPy.
+
+    Output voxel centres are mapped into source voxel coordinates slab by slab and
+    interpolated with nearest neighbour ("nn"), trilinear ("linear") or Lagrange
+    cubic ("cubic") weights. Points outside the source are zero, as in AFNI.
+    """
+    shape = tuple(shape or data.shape)
+    vox_map = np.linalg.inv(source_affine) @ target_affine
+    # Zero padding keeps every interpolation tap in bounds; clipping far-away taps lands in the padding
+    pad = {"nn": 1, "linear": 1, "cubic": 2}[interpolation]
+    padded = np.pad(data.astype(np.float32, copy=False), pad)
+    upper = np.array(padded.shape) - 1
+    
+    out = np.empty(shape, dtype=np.float32)
+    slab = max(1, RESAMPLE_SLAB_VOXELS // (shape[0] * shape[1]))
+    ii, jj = np.meshgrid(np.arange(shape[0]), np.arange(shape[1]), indexing="ij")
+    for k0 in range(0, shape[2], slab):
+        kk = np.arange(k0, min(k0 + slab, shape[2]))
+        grid = np.stack([
+            np.broadcast_to(ii[..., None], (*ii.shape, len(kk))),
+            np.broadcast_to(jj[..., None], (*jj.shape, len(kk))),
+            np.broadcast_to(kk, (*ii.shape, len(kk))),
+        ]).reshape(3, -1)
+        coords = vox_map[:3, :3] @ grid + vox_map[:3, 3:4] + pad
+        
+        if interpolation == "nn":
+            idx = np.clip(np.rint(coords).astype(np.intp), 0, upper[:, None])
+            values = padded[idx[0], idx[1], idx[2]]
+        else:
+            base = np.floor(coords)
+            offsets, weights = zip(*(
+                _interpolation_weights((coords[axis] - base[axis]).astype(np.float32), interpolation)
+                for axis in range(3)
+            ))
+            base = base.astype(np.intp)
+            values = np.zeros(coords.shape[1], dtype=np.float32)
+            for ox, wx in zip(offsets[0], weights[0]):
+                ix = np.clip(base[0] + ox, 0, upper[0])
+                for oy, wy in zip(offsets[1], weights[1]):
+                    iy = np.clip(base[1] + oy, 0, upper[1])
+                    wxy = wx * wy
+                    for oz, wz in zip(offsets[2], weights[2]):
+                        iz = np.clip(base[2] + oz, 0, upper[2])
+                        values += wxy * wz * padded[ix, iy, iz]
+        out[:, :, kk] = values.reshape(shape[0], shape[1], len(kk))
+    return out
+
+def _to_stored_dtype(resampled, dtype):
+    """
+    Cast resampled values back to the on-disk dtype, rounding and clipping integer types.
+    """
+    if np.issubdtype(dtype, np.integer):
+        info = np.iinfo(dtype)
+        resampled = np.clip(np.rint(resampled), info.min, info.max)
+    return resampled.astype(dtype)
+
+def deoblique_native(input_image_path, output_image_path, interpolation="linear"):
+    """
+    Deoblique a NIfTI image in-process onto the same cardinal grid 3dWarp uses.
+
+    The stored values are resampled and cast back to the on-disk dtype (rounded and
+    clipped for integer types), keeping the original scl_slope/scl_inter.
+    """
+    img = nib.load(input_image_path)
+    target_affine = cardinal_affine(img.affine)
+    resampled = resample_to_grid(read_first_volume(img), img.affine, target_affine, interpolation)
+    
+    img_out = nib.Nifti1Image(_to_stored_dtype(resampled, img.get_data_dtype()), target_affine,
+                              img.header.copy())
+    img_out.header.set_slope_inter(img.dataobj.slope, img.dataobj.inter)
+    nib.save(img_out, output_image_path)
+
+def reorient_params(input_image_path, output_image_path, orientation="LPI"):
+    """
+    niwrap parameters of the 3dresample call that reorients an image (with absolute
+    paths, see deoblique_params).
+    """
+    return afni.v_3dresample_params(in_file=os.path.abspath(input_image_path), orientation=orientation,
+                                    prefix=os.path.abspath(output_image_path))
 
 def reorient_to_orientation(input_image_path, output_image_path, orientation="LPI"):
     """
     Reorient image to specified orientation.
     """
-    afni.v_3dresample(in_file=input_image_path, orientation=orientation, prefix=output_image_path)
+    afni.v_3dresample_execute(reorient_params(input_image_path, output_image_path, orientation))
 
-def process_single_file(input_image_path, output_dir=None, orientation="LPI"):
+def orientation_transform(affine, orientation):
     """
-    Process a single T1w file with proper error handling.
+    nibabel orientation transform taking the affine's voxel axes to the AFNI orientation code.
+    """
+    return nib.orientations.ornt_transform(
+        nib.orientations.io_orientation(affine),
+        nib.orientations.axcodes2ornt(afni_to_axcodes(orientation)),
+    )
+
+def reoriented_header(hdr, transform):
+    """
+    Copy of the header with the frequency/phase/slice labels following their data axes.
+    """
+    hdr = hdr.copy()
+    freq, phase, slice_ = hdr.get_dim_info()
+    hdr.set_dim_info(*(None if axis is None else int(transform[axis, 0]) for axis in (freq, phase, slice_)))
+    return hdr
+
+def reorient_native(input_image_path, output_image_path, orientation="LPI"):
+    """
+    Reorient image to specified orientation in-process with nibabel.
+
+    Between any two orientation codes this is only axis permutations and flips:
+    the stored values are rearranged as array views (no interpolation) and the
+    affine is updated to match.
+    """
+    img = nib.load(input_image_path)
+    transform = orientation_transform(img.affine, orientation)
+    data = nib.orientations.apply_orientation(read_first_volume(img), transform)
+    affine = img.affine @ nib.orientations.inv_ornt_aff(transform, img.shape[:3])
+    
+    img_out = nib.Nifti1Image(data, affine, reoriented_header(img.header, transform))
+    img_out.header.set_slope_inter(img.dataobj.slope, img.dataobj.inter)
+    nib.save(img_out, output_image_path)
+
+def deoblique_reorient_native(input_image_path, output_image_path, orientation="LPI", interpolation="linear"):
+    """
+    Deoblique and reorient in a single resampling pass.
+
+    The reorientation of the cardinal 3dWarp grid is folded into the target affine,
+    so the stored values are interpolated once and written once, with the same
+    result as deoblique_native followed by reorient_native.
+    """
+    img = nib.load(input_image_path)
+    shape = img.shape[:3]
+    cardinal = cardinal_affine(img.affine)
+    transform = orientation_transform(cardinal, orientation)
+    target_affine = cardinal @ nib.orientations.inv_ornt_aff(transform, shape)
+    target_shape = [0, 0, 0]
+    for axis, (new_axis, _) in enumerate(transform):
+        target_shape[int(new_axis)] = shape[axis]
+    
+    resampled = resample_to_grid(read_first_volume(img), img.affine, target_affine, interpolation, target_shape)
+    img_out = nib.Nifti1Image(_to_stored_dtype(resampled, img.get_data_dtype()), target_affine,
+                              reoriented_header(img.header, transform))
+    img_out.header.set_slope_inter(img.dataobj.slope, img.dataobj.inter)
+    nib.save(img_out, output_image_path)
+
+# Deoblique and reorientation engines selectable with --deoblique-engine/--reorient-engine
+DEOBLIQUE_ENGINES = {
+    "afni": deoblique,
+    "native": deoblique_native,
+}
+
+REORIENT_ENGINES = {
+    "afni": reorient_to_orientation,
+    "native": reorient_native,
+}
+
+def collapse_mounts(paths):
+    """
+    Absolute, de-duplicated directories to bind mount, dropping those already
+    visible through a mounted parent.
+    """
+    paths = sorted({os.path.abspath(path) for path in paths})
+    return [path for path in paths
+            if not any(path.startswith(parent.rstrip(os.sep) + os.sep) for parent in paths)]
+
+class WarmContainerRunner:
+    """
+    niwrap runner that keeps one long-lived container per image and runs every
+    command in it with `docker exec`, instead of paying container startup per call.
+
+    The given host directories (and the runner's scratch directory) are mounted
+    once, at identical paths, so host paths can be handed to AFNI unchanged.
+    """
+    
+    def __init__(self, mounts, docker_executable="docker", data_dir=None, environ=None):
+        self.docker_executable = docker_executable
+        self.environ = environ or {}
+        self.data_dir = data_dir or tempfile.mkdtemp(prefix=f"niwrap_styx_{os.getpid()}_")
+        self.mounts = collapse_mounts([*mounts, self.data_dir])
+        self.containers = {}
+        self.execution_counter = 0
+    
+    def container_for(self, image):
+        """Name of the running container for image, starting it on first use."""
+        if image not in self.containers:
+            name = f"niwrap_warm_{os.getpid()}_{uuid.uuid4().hex[:8]}"
+            mount_args = [arg for path in self.mounts for arg in ("-v", f"{path}:{path}")]
+            user_args = ["-u", f"{os.getuid()}:{os.getgid()}"] if hasattr(os, "getuid") else []
+            env_args = [arg for key, value in self.environ.items() for arg in ("-e", f"{key}={value}")]
+            subprocess.run(
+                [self.docker_executable, "run", "-d", "--rm", "--name", name, *user_args, *mount_args,
+                 *env_args, "--entrypoint", "sleep", image, "infinity"],
+                check=True, capture_output=True, text=True,
+            )
+            self.containers[image] = name
+        return self.containers[image]
+    
+    def start_execution(self, metadata):
+        output_dir = os.path.join(self.data_dir, f"{self.execution_counter}_{metadata.name}")
+        self.execution_counter += 1
+        return WarmContainerExecution(self, metadata, output_dir)
+    
+    def stop(self):
+        """Remove the containers and the scratch directory."""
+        for name in self.containers.values():
+            subprocess.run([self.docker_executable, "rm", "-f", name], capture_output=True)
+        self.containers.clear()
+        shutil.rmtree(self.data_dir, ignore_errors=True)
+
+class WarmContainerExecution:
+    """
+    A single niwrap tool call inside a WarmContainerRunner container.
+    """
+    
+    def __init__(self, runner, metadata, output_dir):
+        self.runner = runner
+        self.metadata = metadata
+        self.output_dir = output_dir
+        self.mutable_copies = {}
+        os.makedirs(output_dir, exist_ok=True)
+    
+    def input_file(self, host_file, *, resolve_parent=False, mutable=False):
+        if mutable:
+            return str(self.mutable_copy(host_file))
+        # Inputs live under the identically mounted directories
+        return os.path.abspath(host_file)
+    
+    def output_file(self, local_file, *, optional=False):
+        return pathlib.Path(self.output_dir) / local_file
+    
+    def mutable_copy(self, host_file):
+        """
+        Writable copy of an input the tool modifies in place, made once per input in
+        the (mounted) output directory, so the original is never touched.
+        """
+        source = os.path.abspath(host_file)
+        if source not in self.mutable_copies:
+            name, counter = os.path.basename(source), 1
+            while name in self.mutable_copies.values():
+                stem, dot, suffix = os.path.basename(source).partition(".")
+                name, counter = f"{stem}_{counter}{dot}{suffix}", counter + 1
+            destination = os.path.join(self.output_dir, name)
+            shutil.copy2(source, destination)
+            os.chmod(destination, os.stat(destination).st_mode | 0o200)
+            self.mutable_copies[source] = name
+        return pathlib.Path(self.output_dir) / self.mutable_copies[source]
+    
+    def params(self, params):
+        return params
+    
+    def run(self, cargs, *, handle_stdout=None, handle_stderr=None):
+        container = self.runner.container_for(self.metadata.container_image_tag)
+        result = subprocess.run(
+            [self.runner.docker_executable, "exec", "-w", self.output_dir, container, *cargs],
+            capture_output=True, text=True,
+        )
+        for handler, output in ((handle_stdout, result.stdout), (handle_stderr, result.stderr)):
+            if handler:
+                for line in output.splitlines():
+                    handler(line)
+        if result.returncode:
+            raise niwrap.StyxRuntimeError(result.returncode, cargs,
+                                          stdout_tail=result.stdout.splitlines()[-40:],
+                                          stderr_tail=result.stderr.splitlines()[-40:])
+
+# Execution backends selectable with --runner, and the optional packages (not niwrap
+# dependencies) providing the container runners
+RUNNERS = ["local", "docker", "apptainer"]
+RUNNER_PACKAGES = {"docker": "styxdocker", "apptainer": "styxsingularity"}
+
+def import_runner_package(kind):
+    """Import the optional package behind a container runner, explaining how to install it if missing."""
+    package = RUNNER_PACKAGES[kind]
+    try:
+        return importlib.import_module(package)
+    except ImportError:
+        raise ImportError(f"--runner {kind} needs the {package} package (pip install {package})") from None
+
+def make_runner(kind="local", mounts=(), warm=False, environ=None, data_dir=None):
+    """
+    Build the niwrap runner for an execution backend.
+
+    "local" execs AFNI binaries found on PATH, "docker" and "apptainer" run them in
+    the niwrap AFNI image with the given host directories mounted at identical
+    paths (so plain host paths passed to 3dWarp resolve inside the container).
+    warm keeps one long-lived Docker container (see WarmContainerRunner). environ
+    is added to the environment of every AFNI call.
+    """
+    data_dir = data_dir or tempfile.mkdtemp(prefix=f"niwrap_styx_{os.getpid()}_")
+    mounts = collapse_mounts([*mounts, data_dir])
+    if kind == "local":
+        # LocalRunner replaces the whole environment, PATH included
+        return niwrap.LocalRunner(data_dir=data_dir, environ={**os.environ, **environ} if environ else None)
+    if kind == "docker":
+        if warm:
+            return WarmContainerRunner(mounts, data_dir=data_dir, environ=environ)
+        return import_runner_package("docker").DockerRunner(
+            data_dir=data_dir, environ=environ,
+            docker_extra_args=[arg for path in mounts for arg in ("-v", f"{path}:{path}")])
+    if kind == "apptainer":
+        return import_runner_package("apptainer").SingularityRunner(
+            data_dir=data_dir, environ=environ, singularity_executable="apptainer",
+            singularity_extra_args=["--no-mount", "hostfs", *(arg for path in mounts for arg in ("--bind", path))])
+    raise ValueError(f"Unknown runner '{kind}'. Must be one of: {', '.join(RUNNERS)}")
+
+# Environment variables capping the threads of OpenMP (AFNI included) and the BLAS libraries
+THREAD_ENV_VARS = ["OMP_NUM_THREADS", "OPENBLAS_NUM_THREADS", "MKL_NUM_THREADS", "VECLIB_MAXIMUM_THREADS",
+                   "NUMEXPR_NUM_THREADS"]
+
+def thread_environment(threads):
+    """Environment limiting OpenMP/BLAS (and so AFNI) to the given number of threads."""
+    return dict.fromkeys(THREAD_ENV_VARS, str(threads))
+
+def limit_threads(threads):
+    """
+    Cap the threads of this process and of the processes it starts.
+
+    The environment covers child processes; NumPy's BLAS is already loaded, so
+    its pools are resized through threadpoolctl when that is installed.
+    """
+    os.environ.update(thread_environment(threads))
+    try:
+        from threadpoolctl import threadpool_limits
+    except ImportError:
+        return
+    threadpool_limits(threads)
+
+def _ignore_signal(signum, frame):
+    pass
+
+def init_worker(runner_config=None, threads=None, journal_path=None):
+    """
+    Worker process initializer: with runner_config, a (kind, mounts, warm, environ)
+    tuple for make_runner, route this worker's niwrap calls through its own runner,
+    whose containers and scratch directory are removed when the worker exits. With
+    threads, cap the worker's OpenMP/BLAS threads (see limit_threads). With
+    journal_path, journal the worker's final moves (see Journal).
+    """
+    # Ctrl+C reaches the whole process group; only the main process handles it and shuts the pool down.
+    # A no-op handler rather than SIG_IGN, which AFNI commands would inherit: handlers reset on exec,
+    # so they still stop on Ctrl+C.
+    signal.signal(signal.SIGINT, _ignore_signal)
+    if threads is not None:
+        limit_threads(threads)
+    if journal_path is not None:
+        open_journal(journal_path)
+    if runner_config is not None:
+        data_dir = tempfile.mkdtemp(prefix=f"niwrap_styx_{os.getpid()}_")
+        runner = make_runner(*runner_config, data_dir=data_dir)
+        cleanup = runner.stop if isinstance(runner, WarmContainerRunner) else \
+            partial(shutil.rmtree, data_dir, ignore_errors=True)
+        mp.util.Finalize(runner, cleanup, exitpriority=10)
+        niwrap.set_global_runner(runner)
+
+class ThreadLocalRunner:
+    """
+    niwrap runner giving every thread its own runner built by make_runner, so the
+    container threads of the staged pipeline never share an execution counter or
+    a warm container.
+    """
+    
+    def __init__(self, runner_config):
+        self.runner_config = runner_config
+        self.local = threading.local()
+        self.lock = threading.Lock()
+        self.runners = []
+    
+    def thread_runner(self):
+        runner = getattr(self.local, "runner", None)
+        if runner is None:
+            data_dir = tempfile.mkdtemp(prefix=f"niwrap_styx_{os.getpid()}_")
+            runner = self.local.runner = make_runner(*self.runner_config, data_dir=data_dir)
+            with self.lock:
+                self.runners.append((runner, data_dir))
+        return runner
+    
+    def start_execution(self, metadata):
+        return self.thread_runner().start_execution(metadata)
+    
+    def stop(self):
+        """Stop warm containers and remove the scratch directories of every thread's runner."""
+        with self.lock:
+            runners, self.runners = self.runners, []
+        for runner, data_dir in runners:
+            if isinstance(runner, WarmContainerRunner):
+                runner.stop()
+            shutil.rmtree(data_dir, ignore_errors=True)
+
+def output_path_for(input_image_path, output_dir=None):
+    """
+    Where the corrected file is written: the output directory, or the input itself.
+    """
+    if output_dir:
+        os.makedirs(output_dir, exist_ok=True)
+        return os.path.join(output_dir, os.path.basename(input_image_path))
+    return input_image_path
+
+# Resume journal, next to the manifest
+JOURNAL_NAME = ".niwrap_journal.jsonl"
+
+class Journal:
+    """
+    Append-only log of per-file "start" and "commit" events around the final move.
+
+    Each event is one JSON line written with a single O_APPEND write and fsync'd,
+    so concurrent workers never interleave and a crash loses at most the event
+    being written. A file whose last event is "commit" is finished.
+    """
+    
+    def __init__(self, path):
+        self.path = path
+        self.fd = os.open(path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+        # A crash can leave the last event without its newline; end it so the next event gets its own line
+        with open(path, "rb") as f:
+            size = f.seek(0, os.SEEK_END)
+            f.seek(max(size - 1, 0))
+            if size and f.read(1) != b"\n":
+                os.write(self.fd, b"\n")
+
+    def append(self, event, input_image_path):
+        line = json.dumps({"event": event, "file": os.path.abspath(input_image_path), "pid": os.getpid(),
+                           "time": time.time()})
+        os.write(self.fd, (line + "\n").encode())
+        os.fsync(self.fd)
+    
+    def close(self):
+        os.close(self.fd)
+
+def read_journal(path):
+    """
+    Last event per file in a journal, ignoring a line left incomplete by a crash.
+    """
+    events = {}
+    try:
+        with open(path) as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    continue
+                events[entry["file"]] = entry["event"]
+    except FileNotFoundError:
+        pass
+    return events
+
+# The journal of this process, opened by open_journal (in workers through init_worker)
+_journal = None
+
+def open_journal(path):
+    """Journal the final moves of this process to path (None stops journaling)."""
+    global _journal
+    if _journal is not None:
+        _journal.close()
+    _journal = Journal(path) if path else None
+
+def journal_in_place(input_image_path):
+    """Journal a file whose output is already in place, with nothing to move, as committed."""
+    if _journal is not None:
+        _journal.append("start", input_image_path)
+        _journal.append("commit", input_image_path)
+
+def fsync_path(path):
+    """Flush a file, or the renames into a directory, to disk (no-op where path cannot be opened)."""
+    try:
+        fd = os.open(path, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+def finalize_output(current_path, input_image_path, output_dir=None):
+    """
+    Put the last intermediate in the final location: renamed, or copied across
+    filesystems, next to the destination, flushed and swapped in by commit_output,
+    so a kill never leaves a partial file in place of the input. When every stage
+    was a no-op (current_path is the input), the input is copied to the output
+    directory or left alone in-place.
+    """
+    if current_path == input_image_path and not output_dir:
+        journal_in_place(input_image_path)
+        return
+    temp_path = f"{output_path_for(input_image_path, output_dir)}.{uuid.uuid4().hex[:8]}.tmp"
+    try:
+        if current_path == input_image_path:
+            shutil.copy2(input_image_path, temp_path)
+        else:
+            try:
+                os.rename(current_path, temp_path)
+            except OSError:
+                # Different filesystem
+                shutil.copy2(current_path, temp_path)
+        fsync_path(temp_path)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+    commit_output(temp_path, input_image_path, output_dir)
+
+def commit_output(temp_path, input_image_path, output_dir=None):
+    """
+    Atomically put temp_path, a complete output written next to its destination,
+    in place as the output of input_image_path, journaled like finalize_output.
+    """
+    final_output_path = output_path_for(input_image_path, output_dir)
+    if _journal is not None:
+        _journal.append("start", input_image_path)
+    os.replace(temp_path, final_output_path)
+    if _journal is not None:
+        fsync_path(os.path.dirname(os.path.abspath(final_output_path)))
+        _journal.append("commit", input_image_path)
+
+def copy_output(source_image_path, duplicate_image_path, output_dir=None):
+    """
+    Give duplicate_image_path, an identical copy of source_image_path, the corrected
+    output of source_image_path without processing it again. The output is cloned
+    rather than hardlinked so the two files stay independent.
+    """
+    source_output_path = output_path_for(source_image_path, output_dir)
+    output_path = output_path_for(duplicate_image_path, output_dir)
+    if os.path.exists(output_path) and os.path.samefile(source_output_path, output_path):
+        # Same file (a link to the source, or the same name in the output directory)
+        journal_in_place(duplicate_image_path)
+        return
+    temp_path = f"{output_path}.{uuid.uuid4().hex[:8]}.tmp"
+    clone_file(source_output_path, temp_path)
+    commit_output(temp_path, duplicate_image_path, output_dir)
+
+# Prefixes of this tool's temporary directories, each followed by the owning process id
+TEMP_DIR_PREFIXES = ["niwrap_batch_", "niwrap_styx_", "niwrap_"]
+
+def clean_orphaned_temp_dirs(temp_root=None):
+    """
+    Remove niwrap_* temporary directories whose owning process no longer exists,
+    left behind by killed runs. Returns the number removed.
+    """
+    temp_root = temp_root or tempfile.gettempdir()
+    removed = 0
+    for entry in os.scandir(temp_root):
+        prefix = next((prefix for prefix in TEMP_DIR_PREFIXES if entry.name.startswith(prefix)), None)
+        pid = entry.name[len(prefix):].split("_")[0] if prefix else ""
+        if not pid.isdigit() or not entry.is_dir(follow_symlinks=False):
+            continue
+        try:
+            os.kill(int(pid), 0)
+            continue
+        except ProcessLookupError:
+            pass
+        except PermissionError:
+            # Alive, owned by someone else
+            continue
+        shutil.rmtree(entry.path, ignore_errors=True)
+        removed += 1
+    return removed
+
+def clean_partial_outputs(*directories):
+    """
+    Remove the *.tmp files that finalize_output and commit_output leave next to
+    outputs when killed mid-copy. Returns the number removed.
+    """
+    removed = 0
+    for directory in filter(None, directories):
+        for temp_path in glob.glob(os.path.join(directory, "**", T1W_NAME_PATTERN + ".*.tmp"), recursive=True):
+            os.remove(temp_path)
+            removed += 1
+    return removed
+
+# Manifest of processed files, kept in the dataset root (or the output directory). Bump
+# PIPELINE_VERSION whenever a change alters the corrected output of existing options.
+MANIFEST_NAME = ".niwrap_manifest.sqlite"
+PIPELINE_VERSION = "1"
+
+def pipeline_version(deoblique_engine="afni", reorient_engine="afni", interpolation="linear",
+                     oblique_tolerance=OBLIQUE_TOLERANCE_DEG, header_mode="stream", preserve_dtype=True):
+    """
+    Version string of the pipeline and every option that shapes its output, shared
+    by the manifest and the result cache.
+    """
+    return (f"{PIPELINE_VERSION}/deoblique={deoblique_engine}:{interpolation}:{oblique_tolerance:g}"
+            f"/reorient={reorient_engine}/header={header_mode}:{'preserve' if preserve_dtype else 'rescale'}")
+
+def file_sha256(path):
+    """SHA-256 hex digest of a file's bytes, read in chunks."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(STREAM_CHUNK_SIZE), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def file_state(path, sha256=None):
+    """Size, mtime and SHA-256 (hashed unless given) of a file, as recorded in the manifest."""
+    stat = os.stat(path)
+    return stat.st_size, stat.st_mtime_ns, sha256 if sha256 is not None else file_sha256(path)
+
+def manifest_states(input_image_path, output_dir=None, input_sha256=None, output_sha256=None):
+    """
+    Manifest states (see file_state) of a processed file's input and output, reusing
+    the digests already known. Taken by the worker that wrote the output.
+    """
+    output_path = output_path_for(input_image_path, output_dir)
+    output_state = file_state(output_path, output_sha256)
+    if output_path == input_image_path:
+        return output_state, output_state
+    return file_state(input_image_path, input_sha256), output_state
+
+class Manifest:
+    """
+    SQLite record of processed files with the state of their input and output, so
+    re-runs skip files unchanged since they were corrected with the same settings.
+    """
+    
+    def __init__(self, dataset, orientation, version, output_dir=None):
+        self.dataset = os.path.abspath(dataset)
+        self.orientation = orientation
+        self.version = version
+        self.output_dir = output_dir
+        self.path = os.path.join(output_dir or dataset, MANIFEST_NAME)
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        self.db = sqlite3.connect(self.path, isolation_level=None)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("""
+            CREATE TABLE IF NOT EXISTS processed (
+                path TEXT PRIMARY KEY,
+                input_size INTEGER, input_mtime_ns INTEGER, input_sha256 TEXT,
+                output_size INTEGER, output_mtime_ns INTEGER, output_sha256 TEXT,
+                orientation TEXT, pipeline_version TEXT, processed_at REAL
+            )""")
+    
+    def key(self, input_image_path):
+        return os.path.relpath(os.path.abspath(input_image_path), self.dataset)
+    
+    @staticmethod
+    def _matches(path, size, mtime_ns, sha256):
+        # Same size and either the same mtime or, failing that, the same content
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return False
+        if stat.st_size != size:
+            return False
+        return stat.st_mtime_ns == mtime_ns or file_sha256(path) == sha256
+    
+    def is_processed(self, input_image_path):
+        """Whether the file is unchanged since it was processed with these settings."""
+        row = self.db.execute(
+            "SELECT input_size, input_mtime_ns, input_sha256, output_size, output_mtime_ns, output_sha256, "
+            "orientation, pipeline_version FROM processed WHERE path = ?", (self.key(input_image_path),)
+        ).fetchone()
+        if row is None or row[6:] != (self.orientation, self.version):
+            return False
+        output_path = output_path_for(input_image_path, self.output_dir)
+        if output_path != input_image_path and not self._matches(input_image_path, *row[:3]):
+            return False
+        return self._matches(output_path, *row[3:6])
+    
+    def record(self, input_image_path, states):
+        """Record a successfully processed file with its input and output states (see manifest_states)."""
+        input_state, output_state = states
+        self.db.execute("INSERT OR REPLACE INTO processed VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                        (self.key(input_image_path), *input_state, *output_state, self.orientation,
+                         self.version, time.time()))
+    
+    def close(self):
+        self.db.close()
+
+def unprocessed_files(t1w_files, manifest, skipped):
+    """
+    Yield the files the manifest does not list as processed, counting the others
+    in skipped["unchanged"].
+    """
+    for file_path in t1w_files:
+        if manifest.is_processed(file_path):
+            skipped["unchanged"] += 1
+        else:
+            yield file_path
+
+def uncommitted_files(t1w_files, events, skipped):
+    """
+    Yield the files whose last journal event (see read_journal) is not "commit",
+    counting the others in skipped["committed"]. Files with a "start" but no
+    "commit" were interrupted mid-move and are processed again.
+    """
+    for file_path in t1w_files:
+        if events.get(os.path.abspath(file_path)) == "commit":
+            skipped["committed"] += 1
+        else:
+            yield file_path
+
+# Content-addressed result cache, shareable across datasets (--cache)
+CACHE_INDEX_NAME = "index.sqlite"
+DEFAULT_CACHE_SIZE = 20 * 1024 ** 3
+# ioctl that clones a file's extents copy-on-write (Btrfs, XFS, bcachefs)
+FICLONE = 0x40049409
+
+def clone_file(source, destination, allow_link=False):
+    """
+    Create destination with the contents of source, sharing its data where the
+    filesystem allows: a reflink (copy-on-write clone), then, with allow_link, a
+    hardlink, and a plain copy otherwise. Returns the method used.
     """
     try:
-        # Determine output path
-        if output_dir:
-            filename = os.path.basename(input_image_path)
-            final_output_path = os.path.join(output_dir, filename)
-            os.makedirs(output_dir, exist_ok=True)
+        import fcntl
+        with open(source, "rb") as src, open(destination, "wb") as dst:
+            fcntl.ioctl(dst.fileno(), FICLONE, src.fileno())
+        return "reflink"
+    except (ImportError, OSError):
+        if not os.path.exists(source):
+            raise FileNotFoundError(source)
+        try:
+            os.remove(destination)
+        except FileNotFoundError:
+            pass
+    if allow_link:
+        try:
+            os.link(source, destination)
+            return "hardlink"
+        except OSError:
+            pass
+    shutil.copyfile(source, destination)
+    return "copy"
+
+class ResultCache:
+    """
+    Corrected outputs keyed by their input's content and the output settings, so identical scans
+    in any dataset are processed once; beyond max_size bytes the least recently used are evicted.
+    """
+    
+    def __init__(self, directory, settings=None, max_size=None, hardlink=False):
+        self.directory = directory
+        self.settings = settings
+        self.max_size = max_size
+        self.hardlink = hardlink
+        os.makedirs(os.path.join(directory, "objects"), exist_ok=True)
+        # Several runs may share the cache; wait for each other's writes
+        self.db = sqlite3.connect(os.path.join(directory, CACHE_INDEX_NAME), isolation_level=None, timeout=60)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("CREATE TABLE IF NOT EXISTS entries (key TEXT PRIMARY KEY, size INTEGER, last_used REAL, "
+                        "sha256 TEXT)")
+        self.db.execute("CREATE TABLE IF NOT EXISTS stats (name TEXT PRIMARY KEY, value INTEGER)")
+    
+    def key(self, input_image_path, sha256=None):
+        """Cache key of an input: its content hash (sha256, if already known) combined with the output settings."""
+        sha256 = sha256 or file_sha256(input_image_path)
+        return hashlib.sha256(f"{sha256}\n{self.settings}".encode()).hexdigest()
+    
+    def object_path(self, key):
+        return os.path.join(self.directory, "objects", key[:2], key + ".nii.gz")
+    
+    def _count(self, name, amount=1):
+        self.db.execute("INSERT INTO stats VALUES (?, ?) ON CONFLICT(name) DO UPDATE SET value = value + ?",
+                        (name, amount, amount))
+    
+    def fetch(self, key, input_image_path, output_dir=None):
+        """
+        Reflink or copy (with hardlink, link) the cached output for key into place as the
+        output of input_image_path. Returns the SHA-256 of the output, or None on a miss.
+        """
+        self._count("lookups")
+        row = self.db.execute("SELECT size, sha256 FROM entries WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            return None
+        temp_path = f"{output_path_for(input_image_path, output_dir)}.{uuid.uuid4().hex[:8]}.tmp"
+        try:
+            clone_file(self.object_path(key), temp_path, allow_link=self.hardlink)
+        except FileNotFoundError:
+            # Evicted by a concurrent run
+            self.db.execute("DELETE FROM entries WHERE key = ?", (key,))
+            return None
+        commit_output(temp_path, input_image_path, output_dir)
+        self.db.execute("UPDATE entries SET last_used = ? WHERE key = ?", (time.time(), key))
+        self._count("hits")
+        self._count("bytes_saved", row[0])
+        return row[1]
+    
+    def store(self, key, output_path, sha256):
+        """Add a corrected output with digest sha256 under key, then evict down to max_size."""
+        path = self.object_path(key)
+        if self.db.execute("SELECT 1 FROM entries WHERE key = ?", (key,)).fetchone() is None:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            temp_path = f"{path}.{uuid.uuid4().hex[:8]}.tmp"
+            clone_file(output_path, temp_path)
+            os.replace(temp_path, path)
+        self.db.execute("INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?)",
+                        (key, os.path.getsize(path), time.time(), sha256))
+        self.evict()
+    
+    def evict(self):
+        """Remove least recently used objects until the cache fits in max_size."""
+        if self.max_size is None:
+            return
+        total = self.db.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+        if total <= self.max_size:
+            return
+        for key, size in self.db.execute("SELECT key, size FROM entries ORDER BY last_used").fetchall():
+            if total <= self.max_size:
+                break
+            try:
+                os.remove(self.object_path(key))
+            except FileNotFoundError:
+                pass
+            self.db.execute("DELETE FROM entries WHERE key = ?", (key,))
+            self._count("evictions")
+            total -= size
+    
+    def stats(self):
+        """Entry count, total size and the lookup/hit/eviction counters."""
+        stats = dict(self.db.execute("SELECT name, value FROM stats").fetchall())
+        stats["entries"], stats["size"] = self.db.execute(
+            "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM entries").fetchone()
+        return stats
+    
+    def close(self):
+        self.db.close()
+
+def pipeline_tasks(stages, reorient_engine="afni", deoblique_engine="afni"):
+    """
+    Split a file's planned stages into pipeline tasks: (pool, steps) pairs where
+    consecutive steps on the same pool are grouped. AFNI engines run on the
+    "container" pool, nibabel/NumPy work on the "cpu" pool.
+    """
+    steps = []
+    if "4d_to_3d" in stages:
+        steps.append(("cpu", "4d_to_3d"))
+    if "deoblique" in stages and "reorient" in stages and deoblique_engine == reorient_engine == "native":
+        # Both stages in-process: interpolate and write once
+        steps.append(("cpu", "deoblique_reorient"))
+    else:
+        if "deoblique" in stages:
+            steps.append(("container" if deoblique_engine == "afni" else "cpu", "deoblique"))
+        if "reorient" in stages:
+            steps.append(("container" if reorient_engine == "afni" else "cpu", "reorient"))
+    
+    tasks = []
+    for pool, step in steps:
+        if tasks and tasks[-1][0] == pool:
+            tasks[-1][1].append(step)
         else:
-            final_output_path = input_image_path
+            tasks.append((pool, [step]))
+    return tasks
+
+def run_steps(input_image_path, current_path, temp_dir, steps, finalize=False, output_dir=None,
+              orientation="LPI", preserve_dtype=True, header_mode="stream", reorient_engine="afni",
+              deoblique_engine="afni", interpolation="linear", input_sha256=None):
+    """
+    Run pipeline steps (see pipeline_tasks) on current_path, writing intermediates to temp_dir.
+
+    Each step reads the output of the last step that ran. With finalize, the result
+    is moved to its final location. Returns (current path, stages that turned out
+    to be no-ops, manifest states of the final output or None without finalize).
+    """
+    temp_3d_path = os.path.join(temp_dir, "temp_3d.nii.gz")
+    temp_deoblique_path = os.path.join(temp_dir, "temp_deoblique.nii.gz")
+    temp_final_path = os.path.join(temp_dir, "temp_final.nii.gz")
+    skipped_stages = []
+    
+    for step in steps:
+        if step == "4d_to_3d":
+            if header_mode == "stream":
+                patch_header_streaming(current_path, temp_3d_path)
+            else:
+                convert_4d_to_3d(current_path, temp_3d_path, preserve_dtype)
+            current_path = temp_3d_path
+        elif step == "deoblique_reorient":
+            deoblique_reorient_native(current_path, temp_final_path, orientation, interpolation)
+            current_path = temp_final_path
+        elif step == "deoblique":
+            DEOBLIQUE_ENGINES[deoblique_engine](current_path, temp_deoblique_path, interpolation)
+            current_path = temp_deoblique_path
+        elif step == "reorient":
+            # Check the actual intermediate, which may already be in the target orientation
+            if has_orientation(read_header(current_path), orientation):
+                skipped_stages.append("reorient")
+            else:
+                REORIENT_ENGINES[reorient_engine](current_path, temp_final_path, orientation)
+                current_path = temp_final_path
+    
+    # Move to final location (every stage may have turned out to be a no-op)
+    states = None
+    if finalize:
+        finalize_output(current_path, input_image_path, output_dir)
+        states = manifest_states(input_image_path, output_dir, input_sha256)
+    return current_path, skipped_stages, states
+
+def process_single_file(input_image_path, output_dir=None, orientation="LPI", preserve_dtype=True,
+                        header_mode="stream", stages=None, oblique_tolerance=OBLIQUE_TOLERANCE_DEG,
+                        reorient_engine="afni", deoblique_engine="afni", interpolation="linear",
+                        input_sha256=None):
+    """
+    Process a single T1w file with proper error handling.
+
+    header_mode selects how the 4D→3D stage is done: "stream" patches the header
+    bytes without decoding voxel data, "rebuild" goes through nibabel arrays.
+    stages is the list of stages to run (see plan_stages); by default it is planned
+    from the file's header. Stages that are not run are reported as skipped.
+    reorient_engine and deoblique_engine pick implementations from REORIENT_ENGINES and
+    DEOBLIQUE_ENGINES; interpolation is used for deobliquing. input_sha256 is the
+    input's digest, when already known, for the manifest states in the result.
+    """
+    try:
+        if stages is None:
+            stages = plan_stages(read_header(input_image_path), orientation, oblique_tolerance)
+        skipped_stages = [stage for stage in STAGE_LABELS if stage not in stages]
+        
+        # Nothing to fix: the file is left alone (or copied to the output directory)
+        if not stages:
+            finalize_output(input_image_path, input_image_path, output_dir)
+            return {"status": "success", "file": input_image_path, "skipped_stages": skipped_stages,
+                    "states": manifest_states(input_image_path, output_dir, input_sha256, input_sha256)}
         
         # Create unique temporary directory for this process
         temp_dir = tempfile.mkdtemp(prefix=f"niwrap_{os.getpid()}_{uuid.uuid4().hex[:8]}_")
         
         try:
-            # Use unique temporary files within the temp directory
-            temp_3d_path = os.path.join(temp_dir, "temp_3d.nii.gz")
-            temp_deoblique_path = os.path.join(temp_dir, "temp_deoblique.nii.gz")
-            temp_final_path = os.path.join(temp_dir, "temp_final.nii.gz")
-            
-            # Process the file
-            convert_4d_to_3d(input_image_path, temp_3d_path)
-            deoblique(temp_3d_path, temp_deoblique_path)
-            reorient_to_orientation(temp_deoblique_path, temp_final_path, orientation)
+            # Process the file: every task of the pipeline, one after another
+            steps = [step for _, task_steps in pipeline_tasks(stages, reorient_engine, deoblique_engine)
+                     for step in task_steps]
+            _, no_op_stages, states = run_steps(input_image_path, input_image_path, temp_dir, steps, True,
+                                                output_dir, orientation, preserve_dtype, header_mode,
+                                                reorient_engine, deoblique_engine, interpolation, input_sha256)
             
-            # Move to final location
-            if output_dir:
-                shutil.move(temp_final_path, final_output_path)
-            else:
-                shutil.move(temp_final_path, input_image_path)
-            
-            return {"status": "success", "file": input_image_path}
+            return {"status": "success", "file": input_image_path, "skipped_stages": skipped_stages + no_op_stages,
+                    "states": states}
             
         finally:
             # Clean up temporary directory
@@ -103,6 +1304,410 @@ def process_single_file(input_image_path, output_dir=None, orientation="LPI"):
     except Exception as e:
         return {"status": "error", "file": input_image_path, "error": str(e)}
 
+def run_pipeline(input_paths, plans, step_func, orientation="LPI", oblique_tolerance=OBLIQUE_TOLERANCE_DEG,
+                 reorient_engine="afni", deoblique_engine="afni", cpu_workers=1, container_workers=1,
+                 queue_depth=None, runner_config=None, on_status=None, cost=None, budget=None, threads=None,
+                 journal_path=None, digests=None):
+    """
+    Process files through a staged pipeline, yielding one result dict per file as it finishes.
+
+    nibabel/NumPy steps (step_func, i.e. run_steps) run in a process pool and AFNI steps in
+    a thread pool, so CPU work and container calls overlap; on_status gets the queue depths.
+    """
+    digests = digests or {}
+    workers = {"cpu": cpu_workers, "container": container_workers}
+    capacity = cpu_workers + container_workers + (queue_depth if queue_depth is not None else
+                                                  cpu_workers + container_workers)
+    queued = {pool: deque() for pool in workers}
+    running = Counter()
+    futures = {}
+    files = iter(input_paths)
+    in_flight = 0
+    waiting = None
+    
+    previous_runner = niwrap.get_global_runner()
+    runner = ThreadLocalRunner(runner_config) if runner_config is not None else None
+    if runner is not None:
+        niwrap.set_global_runner(runner)
+    try:
+        with concurrent.futures.ProcessPoolExecutor(max_workers=cpu_workers, initializer=init_worker,
+                                                    initargs=(None, threads, journal_path)) as cpu_pool, \
+                concurrent.futures.ThreadPoolExecutor(max_workers=container_workers,
+                                                      thread_name_prefix="niwrap_container") as container_pool:
+            executors = {"cpu": cpu_pool, "container": container_pool}
+            try:
+                while True:
+                    # Admit new files while the pipeline has room
+                    while in_flight < capacity:
+                        if waiting is None:
+                            input_image_path = next(files, None)
+                            if input_image_path is None:
+                                break
+                            waiting = (input_image_path, cost(input_image_path) if budget is not None else 0)
+                        if budget is not None and not budget.fits(waiting[1]):
+                            break
+                        (input_image_path, amount), waiting = waiting, None
+                        try:
+                            stages = plans.get(input_image_path)
+                            if stages is None:
+                                stages = plan_stages(read_header(input_image_path), orientation, oblique_tolerance)
+                        except Exception as e:
+                            yield {"status": "error", "file": input_image_path, "error": str(e)}
+                            continue
+                        tasks = pipeline_tasks(stages, reorient_engine, deoblique_engine)
+                        if budget is not None:
+                            budget.reserve(amount)
+                        job = {"file": input_image_path, "path": input_image_path, "tasks": tasks, "memory": amount,
+                               "skipped_stages": [stage for stage in STAGE_LABELS if stage not in stages],
+                               "temp_dir": tempfile.mkdtemp(prefix=f"niwrap_{os.getpid()}_{uuid.uuid4().hex[:8]}_")}
+                        queued[tasks[0][0] if tasks else "cpu"].append(job)
+                        in_flight += 1
+                
+                    # Start queued tasks on free workers
+                    for pool, executor in executors.items():
+                        while queued[pool] and running[pool] < workers[pool]:
+                            job = queued[pool].popleft()
+                            steps = job["tasks"][0][1] if job["tasks"] else []
+                            future = executor.submit(step_func, job["file"], job["path"], job["temp_dir"], steps,
+                                                     finalize=len(job["tasks"]) <= 1,
+                                                     input_sha256=digests.get(job["file"]))
+                            futures[future] = (pool, job)
+                            running[pool] += 1
+                
+                    if on_status is not None:
+                        on_status({pool: (running[pool], workers[pool], len(queued[pool])) for pool in workers})
+                    if not futures:
+                        break
+                
+                    done, _ = concurrent.futures.wait(futures, return_when=concurrent.futures.FIRST_COMPLETED)
+                    for future in done:
+                        pool, job = futures.pop(future)
+                        running[pool] -= 1
+                        try:
+                            job["path"], no_op_stages, states = future.result()
+                            job["skipped_stages"] += no_op_stages
+                            job["tasks"] = job["tasks"][1:]
+                            if job["tasks"]:
+                                queued[job["tasks"][0][0]].append(job)
+                                continue
+                            result = {"status": "success", "file": job["file"], "skipped_stages": job["skipped_stages"],
+                                      "states": states}
+                        except Exception as e:
+                            result = {"status": "error", "file": job["file"], "error": str(e)}
+                        in_flight -= 1
+                        if budget is not None:
+                            budget.release(job["memory"])
+                        shutil.rmtree(job["temp_dir"], ignore_errors=True)
+                        yield result
+            finally:
+                # Interrupted (Ctrl+C) or abandoned: tasks still queued in the pools are not started
+                for future in futures:
+                    future.cancel()
+    finally:
+        if runner is not None:
+            niwrap.set_global_runner(previous_runner)
+            runner.stop()
+
+# Markers the generated batch script prints so per-file outcomes can be read back
+BATCH_STATUS_MARKER = "NIWRAP_STATUS"
+
+class ScriptExecution:
+    """
+    Stand-in niwrap execution for turning tool parameters into the command lines
+    of a batch script with the tool's own *_cargs function, so batched calls get
+    exactly the flags of the direct calls. Paths must be absolute: the container
+    runs the script from its image's working directory.
+    """
+    
+    def input_file(self, host_file, *, resolve_parent=False, mutable=False):
+        return os.path.abspath(host_file)
+    
+    def output_file(self, local_file, *, optional=False):
+        return pathlib.Path(local_file)
+
+def afni_script_block(index, commands, log_path):
+    """
+    Bash lines running one file's AFNI commands, stopping at the first failure,
+    and reporting their exit status. (set -e would not work: bash ignores it
+    inside an if condition.)
+    """
+    body = " && ".join(shlex.join(command) for command in commands)
+    return [
+        f"if ( {body} ) > {shlex.quote(log_path)} 2>&1; then",
+        f"  echo {BATCH_STATUS_MARKER} {index} 0",
+        "else",
+        f"  echo {BATCH_STATUS_MARKER} {index} $?",
+        "fi",
+    ]
+
+def parse_batch_statuses(output):
+    """Exit status per file index from the status lines of a batch script's output."""
+    statuses = {}
+    for line in output.splitlines():
+        fields = line.split()
+        if len(fields) == 3 and fields[0] == BATCH_STATUS_MARKER:
+            statuses[int(fields[1])] = int(fields[2])
+    return statuses
+
+def run_afni_script(script_path, mounts):
+    """
+    Run a generated bash script with a single AFNI container invocation and return its stdout.
+
+    Follows the worker's runner: local runners run the script directly, the warm
+    runner uses its container, Apptainer and Docker start a one-off container with
+    the given directories mounted at identical paths.
+    """
+    image = afni.V_3D_WARP_METADATA.container_image_tag
+    runner = niwrap.get_global_runner()
+    environ = getattr(runner, "environ", None) or {}
+    if isinstance(runner, niwrap.LocalRunner):
+        command = ["/bin/bash", script_path]
+    elif isinstance(runner, WarmContainerRunner):
+        command = [runner.docker_executable, "exec", runner.container_for(image), "/bin/bash", script_path]
+    elif hasattr(runner, "singularity_executable"):
+        bind_args = [arg for path in collapse_mounts(mounts) for arg in ("--bind", path)]
+        env_args = [arg for key, value in environ.items() for arg in ("--env", f"{key}={value}")]
+        command = [runner.singularity_executable, "exec", "--no-mount", "hostfs", *bind_args, *env_args,
+                   f"docker://{image}", "/bin/bash", script_path]
+    else:
+        mount_args = [arg for path in collapse_mounts(mounts) for arg in ("-v", f"{path}:{path}")]
+        user_args = ["-u", f"{os.getuid()}:{os.getgid()}"] if hasattr(os, "getuid") else []
+        env_args = [arg for key, value in environ.items() for arg in ("-e", f"{key}={value}")]
+        command = ["docker", "run", "--rm", *user_args, *mount_args, *env_args, "--entrypoint", "/bin/bash",
+                   image, script_path]
+    env = environ if isinstance(runner, niwrap.LocalRunner) and environ else None
+    return subprocess.run(command, check=True, capture_output=True, text=True, env=env).stdout
+
+def process_batch(input_paths, plans=None, output_dir=None, orientation="LPI", preserve_dtype=True,
+                  header_mode="stream", oblique_tolerance=OBLIQUE_TOLERANCE_DEG, reorient_engine="afni",
+                  deoblique_engine="afni", interpolation="linear", digests=None):
+    """
+    Process several T1w files with one AFNI container invocation for the whole batch.
+
+    The Python stages run per file as in process_single_file; the 3dWarp/3dresample
+    commands of all files go into one generated bash script, and each file's exit
+    status is read back from the script output. Returns one result dict per file.
+    """
+    plans = plans or {}
+    digests = digests or {}
+    results = {}
+    temp_dir = tempfile.mkdtemp(prefix=f"niwrap_batch_{os.getpid()}_{uuid.uuid4().hex[:8]}_")
+    
+    try:
+        # Per file: [current path, AFNI commands, skipped stages, reorient natively after the script]
+        jobs = {}
+        for index, input_image_path in enumerate(input_paths):
+            try:
+                stages = plans.get(input_image_path)
+                if stages is None:
+                    stages = plan_stages(read_header(input_image_path), orientation, oblique_tolerance)
+                skipped_stages = [stage for stage in STAGE_LABELS if stage not in stages]
+                prefix = os.path.join(temp_dir, str(index))
+                current_path = input_image_path
+                commands = []
+                native_reorient = False
+                
+                if "4d_to_3d" in stages:
+                    if header_mode == "stream":
+                        patch_header_streaming(current_path, f"{prefix}_3d.nii.gz")
+                    else:
+                        convert_4d_to_3d(current_path, f"{prefix}_3d.nii.gz", preserve_dtype)
+                    current_path = f"{prefix}_3d.nii.gz"
+                if "deoblique" in stages and "reorient" in stages and \
+                        deoblique_engine == reorient_engine == "native":
+                    deoblique_reorient_native(current_path, f"{prefix}_final.nii.gz", orientation, interpolation)
+                    current_path = f"{prefix}_final.nii.gz"
+                    stages = [stage for stage in stages if stage != "reorient"]
+                elif "deoblique" in stages:
+                    if deoblique_engine == "native":
+                        deoblique_native(current_path, f"{prefix}_deoblique.nii.gz", interpolation)
+                    else:
+                        params = deoblique_params(current_path, f"{prefix}_deoblique.nii.gz", interpolation)
+                        commands.append(afni.v_3d_warp_cargs(params, ScriptExecution()))
+                    current_path = f"{prefix}_deoblique.nii.gz"
+                if "reorient" in stages:
+                    # Files not waiting on 3dWarp can be checked for the target orientation now
+                    if not commands and has_orientation(read_header(current_path), orientation):
+                        skipped_stages.append("reorient")
+                    elif reorient_engine == "native":
+                        native_reorient = True
+                    else:
+                        params = reorient_params(current_path, f"{prefix}_final.nii.gz", orientation)
+                        commands.append(afni.v_3dresample_cargs(params, ScriptExecution()))
+                        current_path = f"{prefix}_final.nii.gz"
+                jobs[index] = [current_path, commands, skipped_stages, native_reorient]
+            except Exception as e:
+                results[index] = {"status": "error", "file": input_image_path, "error": str(e)}
+        
+        # One container invocation for every AFNI command in the batch
+        statuses = {}
+        script_jobs = {index: job for index, job in jobs.items() if job[1]}
+        if script_jobs:
+            script_path = os.path.join(temp_dir, "batch.sh")
+            lines = ["#!/bin/bash"]
+            for index, (_, commands, _, _) in script_jobs.items():
+                lines += afni_script_block(index, commands, os.path.join(temp_dir, f"{index}.log"))
+            with open(script_path, "w") as f:
+                f.write("\n".join(lines) + "\n")
+            try:
+                output = run_afni_script(script_path, [temp_dir, *map(os.path.dirname, input_paths)])
+            except Exception as e:
+                output = ""
+                for index in script_jobs:
+                    results[index] = {"status": "error", "file": input_paths[index], "error": str(e)}
+            statuses = parse_batch_statuses(output)
+        
+        for index, (current_path, commands, skipped_stages, native_reorient) in jobs.items():
+            input_image_path = input_paths[index]
+            if index in results:
+                continue
+            try:
+                if commands and statuses.get(index) != 0:
+                    log_path = os.path.join(temp_dir, f"{index}.log")
+                    log_tail = ""
+                    if os.path.exists(log_path):
+                        with open(log_path) as f:
+                            log_tail = " ".join(f.read().split()[-40:])
+                    status = statuses.get(index, "no status reported")
+                    raise RuntimeError(f"AFNI batch command failed ({status}): {log_tail}")
+                if native_reorient:
+                    if has_orientation(read_header(current_path), orientation):
+                        skipped_stages.append("reorient")
+                    else:
+                        final_path = os.path.join(temp_dir, f"{index}_final.nii.gz")
+                        reorient_native(current_path, final_path, orientation)
+                        current_path = final_path
+                finalize_output(current_path, input_image_path, output_dir)
+                results[index] = {"status": "success", "file": input_image_path, "skipped_stages": skipped_stages,
+                                  "states": manifest_states(input_image_path, output_dir,
+                                                            digests.get(input_image_path))}
+            except Exception as e:
+                results[index] = {"status": "error", "file": input_image_path, "error": str(e)}
+        
+        return [results[index] for index in range(len(input_paths))]
+    
+    finally:
+        # Clean up temporary directory
+        if os.path.exists(temp_dir):
+            shutil.rmtree(temp_dir)
+
+# Sizing the default --jobs: CPUs an AFNI container call costs beyond the AFNI process itself
+# (container runtime shims and I/O), and memory assumed per job
+AFNI_CONTAINER_CPU_OVERHEAD = 0.25
+MEMORY_PER_JOB = 1 << 30
+CGROUP_ROOT = "/sys/fs/cgroup"
+
+def _read_text(path):
+    try:
+        with open(path) as f:
+            return f.read().strip()
+    except OSError:
+        return None
+
+def read_meminfo():
+    """/proc/meminfo as a dict of bytes (empty where unavailable)."""
+    meminfo = {}
+    for line in (_read_text("/proc/meminfo") or "").splitlines():
+        name, _, value = line.partition(":")
+        fields = value.split()
+        if fields and fields[0].isdigit():
+            meminfo[name] = int(fields[0]) * (1024 if fields[1:] == ["kB"] else 1)
+    return meminfo
+
+def cgroup_dirs(controller=None):
+    """
+    This process's cgroup directories, innermost first: in the v2 unified hierarchy
+    without a controller, else in the v1 hierarchy of that controller. Ancestors are
+    included because their limits apply too.
+    """
+    dirs = []
+    for line in (_read_text("/proc/self/cgroup") or "").splitlines():
+        _, controllers, path = line.split(":", 2)
+        if controller is None and controllers == "":
+            unified = os.path.exists(os.path.join(CGROUP_ROOT, "cgroup.controllers"))
+            base = CGROUP_ROOT if unified else os.path.join(CGROUP_ROOT, "unified")
+        elif controller is not None and controller in controllers.split(","):
+            base = os.path.join(CGROUP_ROOT, controller)
+        else:
+            continue
+        while True:
+            # Inside a container the host path may not exist below the mount; its ancestors do
+            if os.path.isdir(base + path):
+                dirs.append(base + path)
+            if path in ("/", ""):
+                break
+            path = os.path.dirname(path)
+    return dirs
+
+def cgroup_cpu_limit():
+    """CPUs allowed by the tightest cgroup CPU quota (v2 cpu.max, v1 CFS quota), or None."""
+    limits = []
+    for directory in cgroup_dirs():
+        quota, _, period = (_read_text(os.path.join(directory, "cpu.max")) or "max").partition(" ")
+        if quota != "max" and period:
+            limits.append(int(quota) / int(period))
+    for directory in cgroup_dirs("cpu"):
+        quota = _read_text(os.path.join(directory, "cpu.cfs_quota_us"))
+        period = _read_text(os.path.join(directory, "cpu.cfs_period_us"))
+        if quota and period and int(quota) > 0:
+            limits.append(int(quota) / int(period))
+    return min(limits, default=None)
+
+def available_memory():
+    """
+    Bytes of memory available to this process: MemAvailable, capped by the tightest
+    cgroup memory limit (v2 memory.max, v1 limit_in_bytes) minus its usage. None if unknown.
+    """
+    candidates = []
+    meminfo = read_meminfo()
+    if "MemAvailable" in meminfo:
+        candidates.append(meminfo["MemAvailable"])
+    for directory, limit_file, usage_file in [
+        *((d, "memory.max", "memory.current") for d in cgroup_dirs()),
+        *((d, "memory.limit_in_bytes", "memory.usage_in_bytes") for d in cgroup_dirs("memory")),
+    ]:
+        limit = _read_text(os.path.join(directory, limit_file))
+        usage = _read_text(os.path.join(directory, usage_file))
+        if limit and limit.isdigit() and usage and usage.isdigit():
+            candidates.append(max(int(limit) - int(usage), 0))
+    return min(candidates, default=None)
+
+def default_jobs(containers=True):
+    """
+    Default --jobs for this machine, and the reasons for it as a list of strings.
+
+    Starts from the CPUs this process may run on (affinity mask), capped by the
+    cgroup CPU quota, divided by the CPUs a job costs (more with AFNI in containers)
+    and capped by the available memory at MEMORY_PER_JOB per job.
+    """
+    reasons = []
+    if hasattr(os, "sched_getaffinity"):
+        cpus = len(os.sched_getaffinity(0))
+        reasons.append(f"{cpus} CPUs in the affinity mask")
+    else:
+        cpus = os.cpu_count() or 1
+        reasons.append(f"{cpus} CPUs")
+    quota = cgroup_cpu_limit()
+    if quota is not None and quota < cpus:
+        cpus = quota
+        reasons.append(f"cgroup CPU quota of {quota:g} CPUs")
+    
+    cpus_per_job = 1 + (AFNI_CONTAINER_CPU_OVERHEAD if containers else 0)
+    jobs = max(1, int(cpus / cpus_per_job))
+    if containers:
+        reasons.append(f"{cpus_per_job:g} CPUs per job with AFNI in containers → {jobs} jobs")
+    
+    memory = available_memory()
+    if memory is not None:
+        memory_jobs = max(1, int(memory // MEMORY_PER_JOB))
+        if memory_jobs < jobs:
+            jobs = memory_jobs
+            reasons.append(f"{format_bytes(memory)} memory available at {format_bytes(MEMORY_PER_JOB)} per job "
+                           f"→ {jobs} jobs")
+        else:
+            reasons.append(f"{format_bytes(memory)} memory available, enough for {memory_jobs} jobs")
+    return jobs, reasons
+
 def display_header():
     """Display a beautiful header."""
     title = Text("NIfTI Header Correction Tool", style="bold magenta")
@@ -116,35 +1721,68 @@ def display_header():
     console.print(panel)
     console.print()
 
-def display_summary(dataset, t1w_files, n_jobs, output_dir, orientation):
+def display_summary(dataset, t1w_files, n_jobs, output_dir, orientation, plans=None,
+                    oblique_tolerance=OBLIQUE_TOLERANCE_DEG, runner=None, max_memory=None, jobs_reasons=None,
+                    unchanged=None, duplicates=0):
     """Display processing summary before starting."""
     table = Table(show_header=True, header_style="bold blue", box=box.ROUNDED)
     table.add_column("Parameter", style="cyan", width=20)
     table.add_column("Value", style="green")
     
     table.add_row("Dataset Path", dataset)
-    table.add_row("Files Found", str(len(t1w_files)))
+    table.add_row("Files Found", str(len(t1w_files) + duplicates) if t1w_files is not None
+                  else "Streamed during processing")
+    if duplicates:
+        table.add_row("Identical Copies", f"{duplicates} (output copied, not processed again)")
     table.add_row("Target Orientation", orientation)
-    table.add_row("Parallel Jobs", str(n_jobs))
+    table.add_row("Oblique Tolerance", f"{oblique_tolerance:g}°")
+    jobs_text = str(n_jobs)
+    if jobs_reasons:
+        # How the default was derived
+        jobs_text += "".join(f"\n[dim]{reason}[/dim]" for reason in jobs_reasons)
+    table.add_row("Parallel Jobs", jobs_text)
     table.add_row("Output Mode", output_dir if output_dir else "In-place")
+    if unchanged:
+        table.add_row("Unchanged (manifest)", str(unchanged))
+    if runner is not None:
+        table.add_row("AFNI Runner", runner)
+    table.add_row("Memory Budget", format_bytes(max_memory) if max_memory is not None else "Unlimited")
+    
+    # Work plan from the header triage
+    if plans is not None:
+        for stage, label in STAGE_LABELS.items():
+            table.add_row(f"Needs {label}", str(sum(1 for stages in plans.values() if stage in stages)))
+        table.add_row("Already Correct", str(sum(1 for stages in plans.values() if not stages)))
     
     console.print(Panel(table, title="Processing Summary", border_style="green"))
     console.print()
 
-def display_results(successful, failed, errors):
+def display_results(successful, failed, errors, stage_skips=None, unchanged=0):
     """Display final results."""
     console.print()
     
     # Results table
     table = Table(show_header=True, header_style="bold blue", box=box.ROUNDED)
-    table.add_column("Status", style="bold", width=12)
+    table.add_column("Status", style="bold", width=24)
     table.add_column("Count", justify="right", style="bold", width=8)
     
     table.add_row("✅ Successful", str(successful), style="green")
     table.add_row("❌ Failed", str(failed), style="red")
     table.add_row("📊 Total", str(successful + failed), style="blue")
+    if unchanged:
+        table.add_row("⏭ Unchanged (manifest)", str(unchanged), style="dim")
+    if stage_skips and stage_skips["cached"]:
+        table.add_row("♻ From cache", str(stage_skips["cached"]), style="dim")
+    if stage_skips and stage_skips["duplicate"]:
+        table.add_row("♻ Duplicates (not rerun)", str(stage_skips["duplicate"]), style="dim")
+    for stage, label in STAGE_LABELS.items():
+        if stage_skips and stage_skips[stage]:
+            table.add_row(f"⏭ Skipped {label}", str(stage_skips[stage]), style="dim")
     
     console.print(Panel(table, title="Processing Results", border_style="blue"))
+    if stage_skips and stage_skips["deoblique"]:
+        console.print(f"[dim]{stage_skips['deoblique']} files took the deoblique fast path "
+                      f"(cardinal within tolerance, 3dWarp not run)[/dim]")
     
     # Show errors if any
     if errors:
@@ -163,9 +1801,222 @@ def display_results(successful, failed, errors):
         if len(errors) > 5:
             console.print(f"[dim]... and {len(errors) - 5} more errors[/dim]")
 
-def process_files_with_progress(t1w_files, output_dir, n_jobs, orientation):
-    """Process files with a beautiful progress bar."""
-    results = []
+# Submission orders selectable with --schedule
+SCHEDULES = ["fifo", "largest-first", "smallest-first", "locality"]
+
+def first_volume_bytes(file_path):
+    """
+    Uncompressed size of a file's first volume, from its header: the work proxy for
+    scheduling, since no stage reads or writes the other volumes.
+    """
+    voxels, itemsize = volume_info(read_header(file_path))
+    return voxels * itemsize
+
+def triaged_volume_bytes(volumes, file_path):
+    """first_volume_bytes from the volume_info that triage_files recorded, without reading the header again."""
+    voxels, itemsize = volumes[file_path]
+    return voxels * itemsize
+
+def schedule_files(t1w_files, schedule="fifo", work=first_volume_bytes):
+    """
+    Order files for submission to the workers.
+
+    "largest-first" starts the files with the most work (see first_volume_bytes)
+    first so that no big scan is left running alone at the end, "smallest-first"
+    finishes the most files early, "locality" groups files by directory so each
+    subject/session is read together and "fifo" keeps the discovery order.
+    """
+    if schedule == "fifo":
+        return list(t1w_files)
+    if schedule == "locality":
+        return sorted(t1w_files, key=lambda path: (os.path.dirname(path), path))
+    costs = {}
+    for path in t1w_files:
+        try:
+            costs[path] = work(path)
+        except Exception:
+            # Unreadable files fail at once in their worker
+            costs[path] = 0
+    return sorted(t1w_files, key=costs.get, reverse=schedule == "largest-first")
+
+# Tasks kept in flight per worker when submitting to the pool
+SUBMIT_WINDOW_PER_WORKER = 2
+
+class MemoryBudget:
+    """
+    Memory reserved by the tasks in flight, admitted against a limit in bytes.
+
+    A task that does not fit waits for others to finish; one larger than the whole
+    limit still runs, alone. Without a limit every task fits and only the
+    accounting is kept.
+    """
+    
+    def __init__(self, limit=None):
+        self.limit = limit
+        self.reserved = 0
+        self.peak = 0
+    
+    def fits(self, amount):
+        return self.limit is None or self.reserved == 0 or self.reserved + amount <= self.limit
+    
+    def reserve(self, amount):
+        self.reserved += amount
+        self.peak = max(self.peak, self.reserved)
+    
+    def release(self, amount):
+        self.reserved -= amount
+
+# --jobs auto: least length of a measurement window, relative MB/s change that counts as a
+# gain or loss, and share of MemAvailable in MemTotal below which concurrency backs off
+TUNER_WINDOW_SECONDS = 10.0
+TUNER_MIN_CHANGE = 0.05
+TUNER_MEMORY_FLOOR = 0.10
+
+class ConcurrencyTuner:
+    """
+    Hill-climbing concurrency for --jobs auto.
+
+    Starts with start tasks in flight. Once a measurement window has lasted
+    TUNER_WINDOW_SECONDS and seen a completion per task in flight, its MB/s is
+    compared with the previous window's: a gain keeps stepping concurrency in the
+    same direction, a loss turns around and a flat result holds. Low MemAvailable
+    in /proc/meminfo forces a step down. Every window is kept in log as
+    (elapsed s, concurrency measured, files/s, MB/s, next concurrency, reason).
+    """
+    
+    def __init__(self, maximum, start=2):
+        self.maximum = maximum
+        self.concurrency = max(1, min(start, maximum))
+        self.direction = 1
+        self.previous_rate = None
+        self.started = self.window_started = time.monotonic()
+        self.window_files = 0
+        self.window_bytes = 0
+        self.log = []
+    
+    def record(self, files, size):
+        """Account for finished files of size bytes in total; may change concurrency."""
+        self.window_files += files
+        self.window_bytes += size
+        now = time.monotonic()
+        elapsed = now - self.window_started
+        if elapsed < TUNER_WINDOW_SECONDS or self.window_files < self.concurrency:
+            return
+        
+        files_rate = self.window_files / elapsed
+        rate = self.window_bytes / 1e6 / elapsed
+        meminfo = read_meminfo()
+        step = self.direction
+        if meminfo.get("MemTotal") and meminfo.get("MemAvailable", 0) < TUNER_MEMORY_FLOOR * meminfo["MemTotal"]:
+            step, reason = -1, "memory pressure"
+        elif self.previous_rate is None:
+            reason = "first window"
+        elif rate > self.previous_rate * (1 + TUNER_MIN_CHANGE):
+            reason = "throughput up"
+        elif rate < self.previous_rate * (1 - TUNER_MIN_CHANGE):
+            step = self.direction = -self.direction
+            reason = "throughput down"
+        else:
+            step, reason = 0, "throughput flat"
+        
+        measured = self.concurrency
+        self.concurrency = min(max(measured + step, 1), self.maximum)
+        if step and self.concurrency == measured:
+            # Pinned at a bound: explore the other way next time
+            self.direction = -self.direction
+        self.log.append((now - self.started, measured, files_rate, rate, self.concurrency, reason))
+        self.previous_rate = rate
+        self.window_started = now
+        self.window_files = self.window_bytes = 0
+
+def submit_bounded(submit, items, window, cost=None, budget=None):
+    """
+    Yield (item, future) pairs as futures complete, calling submit(item) lazily so
+    that at most window items of the iterable are in flight at any time. window
+    may be a callable, re-read before each submission (see ConcurrencyTuner).
+
+    With a budget (see MemoryBudget), each item also reserves cost(item) bytes
+    while in flight and items are admitted in order as long as they fit.
+    """
+    items = iter(items)
+    in_flight = {}
+    waiting = None
+    try:
+        while True:
+            while len(in_flight) < (window() if callable(window) else window):
+                if waiting is None:
+                    item = next(items, None)
+                    if item is None:
+                        break
+                    waiting = (item, cost(item) if budget is not None else 0)
+                if budget is not None and not budget.fits(waiting[1]):
+                    break
+                item, amount = waiting
+                waiting = None
+                if budget is not None:
+                    budget.reserve(amount)
+                in_flight[submit(item)] = (item, amount)
+            if not in_flight:
+                return
+            done, _ = concurrent.futures.wait(in_flight, return_when=concurrent.futures.FIRST_COMPLETED)
+            for future in done:
+                item, amount = in_flight.pop(future)
+                if budget is not None:
+                    budget.release(amount)
+                yield item, future
+    finally:
+        # Interrupted (Ctrl+C) or abandoned: items still queued in the pool are not started
+        for future in in_flight:
+            future.cancel()
+
+def batched(items, size):
+    """Yield lists of up to size consecutive items from an iterable."""
+    items = iter(items)
+    while batch := list(itertools.islice(items, size)):
+        yield batch
+
+def display_tuner_log(tuner):
+    """Display how --jobs auto moved concurrency, to help pick a static --jobs."""
+    if not tuner.log:
+        console.print(f"[dim]--jobs auto: run too short to tune, stayed at {tuner.concurrency} jobs[/dim]")
+        return
+    
+    table = Table(show_header=True, header_style="bold blue", box=box.ROUNDED)
+    table.add_column("Elapsed", justify="right")
+    table.add_column("Jobs", justify="right")
+    table.add_column("Files/s", justify="right")
+    table.add_column("MB/s", justify="right")
+    table.add_column("Next Jobs", justify="right")
+    table.add_column("Reason", style="dim")
+    for elapsed, jobs, files_rate, rate, next_jobs, reason in tuner.log:
+        table.add_row(f"{elapsed:.0f}s", str(jobs), f"{files_rate:.2f}", f"{rate:.1f}", str(next_jobs), reason)
+    
+    console.print(Panel(table, title="Concurrency over Time", border_style="blue"))
+    best = max(tuner.log, key=lambda entry: entry[3])
+    console.print(f"[dim]Highest throughput: {best[3]:.1f} MB/s with {best[1]} jobs (use -j {best[1]} for static runs)[/dim]")
+
+def process_files_with_progress(t1w_files, output_dir, n_jobs, orientation, preserve_dtype=True,
+                                header_mode="stream", plans=None, reorient_engine="afni",
+                                deoblique_engine="afni", interpolation="linear", runner_config=None,
+                                batch_size=1, pipeline=None, total=None, oblique_tolerance=OBLIQUE_TOLERANCE_DEG,
+                                max_memory=None, threads_per_job=None, tuner=None, manifest=None,
+                                journal_path=None, cache=None, duplicates=None, executor=None, on_result=None,
+                                digests=None, volumes=None):
+    """
+    Process files with a beautiful progress bar, returning (successful, failed, errors, stage_skips).
+    t1w_files may be a lazy iterable; it is submitted as workers free up (see submit_bounded), and
+    each option is described on the helper it enables.
+    """
+    duplicates = duplicates or {}
+    digests = {} if digests is None else digests
+    plans = plans or {}
+    volumes = volumes or {}
+    successful = 0
+    errors = []
+    stage_skips = Counter()
+    budget = MemoryBudget(max_memory)
+    status = {}
+    cache_keys = {}
     
     with Progress(
         SpinnerColumn(),
@@ -180,33 +2031,348 @@ def process_files_with_progress(t1w_files, output_dir, n_jobs, orientation):
         expand=True
     ) as progress:
         
-        task = progress.add_task("Processing T1w files...", total=len(t1w_files))
+        task = progress.add_task("Processing T1w files...", total=total)
+        
+        def describe(**parts):
+            status.update(parts)
+            if max_memory is not None:
+                status["memory"] = (f"memory {format_bytes(budget.reserved)}/{format_bytes(max_memory)} "
+                                    f"(peak {format_bytes(budget.peak)})")
+            details = " • ".join(status.values())
+            progress.update(task, description="Processing T1w files..." + (f" [dim]{details}[/dim]" if details else ""))
+        
+        def record(result):
+            nonlocal successful
+            cache_key = cache_keys.pop(result["file"], None)
+            if result["status"] == "success":
+                successful += 1
+                stage_skips.update(result.get("skipped_stages", []))
+                if cache_key is not None:
+                    try:
+                        cache.store(cache_key, output_path_for(result["file"], output_dir), result["states"][1][2])
+                    except (OSError, sqlite3.Error) as e:
+                        progress.console.print(f"[yellow]Could not cache {result['file']}: {e}[/yellow]")
+                if manifest is not None:
+                    try:
+                        manifest.record(result["file"], result["states"])
+                    except (OSError, sqlite3.Error) as e:
+                        progress.console.print(f"[yellow]Could not record {result['file']} in the manifest: {e}[/yellow]")
+            else:
+                errors.append(result)
+            progress.advance(task)
+            describe()
+            if on_result is not None:
+                on_result(result)
+            for duplicate in duplicates.get(result["file"], []):
+                record(fan_out(result, duplicate))
+            digests.pop(result["file"], None)
+        
+        def fan_out(result, duplicate):
+            if result["status"] != "success":
+                return {"status": "error", "file": duplicate,
+                        "error": f"Identical to {result['file']}, which failed: {result['error']}"}
+            try:
+                copy_output(result["file"], duplicate, output_dir)
+                # Same content as the copied file, before and after processing
+                states = manifest_states(duplicate, output_dir, digests.get(duplicate), result["states"][1][2])
+            except OSError as e:
+                return {"status": "error", "file": duplicate, "error": str(e)}
+            return {"status": "success", "file": duplicate, "skipped_stages": ["duplicate"], "states": states}
+        
+        def file_memory(file_path):
+            # Triaged files reuse the triage headers; streamed ones are read here
+            volume, stages = volumes.get(file_path), plans.get(file_path)
+            try:
+                if volume is None or stages is None:
+                    hdr = read_header(file_path)
+                    volume = volume_info(hdr)
+                    if stages is None:
+                        stages = plan_stages(hdr, orientation, oblique_tolerance)
+            except Exception:
+                # Unreadable files fail in their worker before using any memory
+                return 0
+            return estimate_memory(volume, stages, header_mode, preserve_dtype, reorient_engine, deoblique_engine)
+        
+        def file_size(file_path):
+            try:
+                return os.path.getsize(file_path)
+            except OSError:
+                return 0
         
         # Use ProcessPoolExecutor for better progress tracking
-        process_func = partial(process_single_file, output_dir=output_dir, orientation=orientation)
+        process_func = partial(process_single_file, output_dir=output_dir, orientation=orientation,
+                               preserve_dtype=preserve_dtype, header_mode=header_mode,
+                               oblique_tolerance=oblique_tolerance, reorient_engine=reorient_engine,
+                               deoblique_engine=deoblique_engine, interpolation=interpolation)
+        
+        def from_cache(file_path):
+            try:
+                # Each input is hashed once, here or (for identical copies) by group_duplicates
+                if digests.get(file_path) is None:
+                    digests[file_path] = file_sha256(file_path)
+                cache_key = cache.key(file_path, digests[file_path])
+                output_sha256 = cache.fetch(cache_key, file_path, output_dir)
+                if output_sha256 is not None:
+                    states = manifest_states(file_path, output_dir, digests[file_path], output_sha256)
+                    record({"status": "success", "file": file_path, "skipped_stages": ["cached"], "states": states})
+                    return True
+            except (OSError, sqlite3.Error) as e:
+                progress.console.print(f"[yellow]Cache lookup failed for {file_path}: {e}[/yellow]")
+                return False
+            cache_keys[file_path] = cache_key
+            return False
         
-        with concurrent.futures.ProcessPoolExecutor(max_workers=n_jobs) as executor:
-            # Submit all tasks
-            future_to_file = {executor.submit(process_func, file_path): file_path 
-                             for file_path in t1w_files}
+        def pending_files():
+            # Files whose output is cached, or that are already correct and need no hashing for the
+            # manifest, never reach the pool
+            for file_path in t1w_files:
+                if plans.get(file_path) == [] and digests.get(file_path) is not None:
+                    record(process_func(file_path, stages=[], input_sha256=digests[file_path]))
+                elif cache is None or not from_cache(file_path):
+                    yield file_path
+        
+        if pipeline is not None:
+            def show_queues(pools):
+                describe(queues=" • ".join(f"{name} {pools[pool][0]}/{pools[pool][1]} busy, {pools[pool][2]} queued"
+                                           for pool, name in (("cpu", "CPU"), ("container", "AFNI"))))
             
-            # Process completed tasks as they finish
-            for future in concurrent.futures.as_completed(future_to_file):
-                try:
-                    result = future.result()
-                    results.append(result)
-                    progress.advance(task)
-                except Exception as e:
-                    file_path = future_to_file[future]
-                    results.append({"status": "error", "file": file_path, "error": str(e)})
-                    progress.advance(task)
+            step_func = partial(run_steps, output_dir=output_dir, orientation=orientation,
+                                preserve_dtype=preserve_dtype, header_mode=header_mode,
+                                reorient_engine=reorient_engine, deoblique_engine=deoblique_engine,
+                                interpolation=interpolation)
+            cpu_workers, container_workers, queue_depth = pipeline
+            for result in run_pipeline(pending_files(), plans, step_func, orientation, oblique_tolerance,
+                                       reorient_engine=reorient_engine, deoblique_engine=deoblique_engine,
+                                       cpu_workers=cpu_workers, container_workers=container_workers,
+                                       queue_depth=queue_depth, runner_config=runner_config,
+                                       on_status=show_queues, cost=file_memory,
+                                       budget=budget if max_memory is not None else None,
+                                       threads=threads_per_job, journal_path=journal_path, digests=digests):
+                record(result)
+        else:
+            batch_func = partial(process_batch, output_dir=output_dir, orientation=orientation,
+                                 preserve_dtype=preserve_dtype, header_mode=header_mode,
+                                 oblique_tolerance=oblique_tolerance, reorient_engine=reorient_engine,
+                                 deoblique_engine=deoblique_engine, interpolation=interpolation)
+            
+            def submit_all(executor):
+                # Submit tasks as workers free up, one file or one batch of files per task
+                if batch_size > 1:
+                    submit = lambda batch: executor.submit(batch_func, batch, {f: plans.get(f) for f in batch},
+                                                           digests={f: digests.get(f) for f in batch})
+                    tasks = batched(pending_files(), batch_size)
+                    # A batch works through its files one at a time
+                    cost = lambda batch: max(map(file_memory, batch))
+                else:
+                    submit = lambda file_path: executor.submit(process_func, file_path, stages=plans.get(file_path),
+                                                               input_sha256=digests.get(file_path))
+                    tasks = pending_files()
+                    cost = file_memory
+                
+                if tuner is not None:
+                    window = lambda: tuner.concurrency
+                else:
+                    window = SUBMIT_WINDOW_PER_WORKER * n_jobs
+                
+                # Process completed tasks as they finish
+                for item, future in submit_bounded(submit, tasks, window, cost,
+                                                   budget if max_memory is not None else None):
+                    file_paths = item if batch_size > 1 else [item]
+                    if tuner is not None:
+                        tuner.record(len(file_paths), sum(map(file_size, file_paths)))
+                        describe(jobs=f"jobs {tuner.concurrency} (auto)")
+                    try:
+                        result = future.result()
+                        for file_result in (result if batch_size > 1 else [result]):
+                            record(file_result)
+                    except Exception as e:
+                        for file_path in file_paths:
+                            record({"status": "error", "file": file_path, "error": str(e)})
+            
+            if executor is not None:
+                submit_all(executor)
+            else:
+                with concurrent.futures.ProcessPoolExecutor(max_workers=tuner.maximum if tuner else n_jobs,
+                                                            initializer=init_worker,
+                                                            initargs=(runner_config, threads_per_job,
+                                                                      journal_path)) as executor:
+                    submit_all(executor)
+    
+    return successful, len(errors), errors, stage_skips
+
+# --watch: seconds between checks for changes, and seconds a file must stay unmodified before it is processed
+WATCH_INTERVAL = 5.0
+WATCH_DEBOUNCE = 10.0
+T1W_NAME_PATTERN = "*T1w.nii.gz"
+
+class DatasetWatcher:
+    """
+    New or changed T1w files under a dataset, reported once they have settled.
+
+    With the optional inotify_simple package (Linux), changes come from inotify
+    watches on every directory of the dataset, so the tree is never rescanned;
+    otherwise the dataset is searched again on every check. A file is handed out
+    once nothing has written to or renamed it for the debounce period, and again
+    only when its size or timestamps change after it was marked as handled.
+    """
+    
+    def __init__(self, dataset):
+        self.dataset = dataset
+        self.seen = {}
+        self.pending = set()
+        self.inotify = None
+        try:
+            import inotify_simple
+            self.flags = inotify_simple.flags
+            self.inotify = inotify_simple.INotify()
+            self.watches = {}
+            self._watch_tree(dataset)
+        except (ImportError, OSError):
+            # Not installed, not Linux, or out of inotify watches
+            self.inotify = None
+        self.mode = "inotify" if self.inotify is not None else "polling"
+    
+    def _watch_tree(self, root):
+        mask = self.flags.CLOSE_WRITE | self.flags.MOVED_TO | self.flags.CREATE
+        for directory, _, files in os.walk(root):
+            self.watches[self.inotify.add_watch(directory, mask)] = directory
+            # Files may have landed before the watch was in place
+            self.pending.update(os.path.join(directory, name) for name in fnmatch.filter(files, T1W_NAME_PATTERN))
     
-    # Separate successful and failed results
-    successful = sum(1 for r in results if r["status"] == "success")
-    failed = sum(1 for r in results if r["status"] == "error")
-    errors = [r for r in results if r["status"] == "error"]
+    @staticmethod
+    def _signature(path):
+        stat = os.stat(path)
+        return stat.st_size, stat.st_mtime_ns, stat.st_ctime_ns
+    
+    def _collect(self, timeout):
+        if self.inotify is None:
+            time.sleep(timeout)
+            self.pending.update(glob.iglob(os.path.join(self.dataset, "**", T1W_NAME_PATTERN), recursive=True))
+            return
+        for event in self.inotify.read(timeout=int(timeout * 1000)):
+            directory = self.watches.get(event.wd)
+            if directory is None:
+                continue
+            path = os.path.join(directory, event.name)
+            if event.mask & self.flags.ISDIR:
+                self._watch_tree(path)
+            elif fnmatch.fnmatch(event.name, T1W_NAME_PATTERN):
+                self.pending.add(path)
+    
+    def changes(self, interval=WATCH_INTERVAL, debounce=WATCH_DEBOUNCE):
+        """
+        Wait up to interval seconds for changes, then return a dict mapping each
+        settled new or changed file to its arrival time (when it was last written
+        or renamed into place).
+        """
+        self._collect(interval)
+        now = time.time()
+        settled = {}
+        for path in list(self.pending):
+            try:
+                signature = self._signature(path)
+            except OSError:
+                self.pending.discard(path)
+                continue
+            if self.seen.get(path) == signature:
+                self.pending.discard(path)
+                continue
+            arrival = max(signature[1:]) / 1e9
+            if now - arrival >= debounce:
+                settled[path] = arrival
+                self.pending.discard(path)
+        return settled
+    
+    def mark(self, path):
+        """Record the current state of a handled file, so only later changes report it."""
+        try:
+            self.seen[path] = self._signature(path)
+        except OSError:
+            self.seen.pop(path, None)
+    
+    def close(self):
+        if self.inotify is not None:
+            self.inotify.close()
+
+def watch_dataset(watcher, process_delta, interval=WATCH_INTERVAL, debounce=WATCH_DEBOUNCE):
+    """
+    Process files as they arrive or change until interrupted with Ctrl+C.
+
+    process_delta(files, on_result) processes a list of settled files like
+    process_files_with_progress, calling on_result with each file's result.
+    Returns the arrival-to-corrected latencies in seconds of the corrected files.
+    """
+    latencies = []
+    console.print(f"[bold green]Watching {watcher.dataset} for new or changed T1w files "
+                  f"({watcher.mode}, Ctrl+C to stop)...[/bold green]")
+    try:
+        while True:
+            arrivals = watcher.changes(interval, debounce)
+            if not arrivals:
+                continue
+            delta_latencies = []
+            
+            def on_result(result):
+                if result["status"] == "success" and result["file"] in arrivals:
+                    delta_latencies.append(time.time() - arrivals[result["file"]])
+            
+            successful, failed, errors, _ = process_delta(sorted(arrivals), on_result)
+            for file_path in arrivals:
+                watcher.mark(file_path)
+            if not successful + failed:
+                # Only files this tool wrote itself, or unchanged per the manifest
+                continue
+            latencies.extend(delta_latencies)
+            
+            text = f"[dim]{time.strftime('%H:%M:%S')}[/dim] {successful} corrected, {failed} failed"
+            if delta_latencies:
+                text += (f" • arrival→corrected latency median {statistics.median(delta_latencies):.1f}s, "
+                         f"max {max(delta_latencies):.1f}s")
+            console.print(text)
+            for error in errors:
+                console.print(f"[red]• {os.path.basename(error['file'])}: {error['error'][:100]}[/red]")
+    except KeyboardInterrupt:
+        console.print("\n[yellow]Stopped watching[/yellow]")
+    return latencies
+
+def display_latency(latencies):
+    """Display the arrival-to-corrected latency of the files corrected in watch mode."""
+    if not latencies:
+        console.print("[dim]No new or changed files were corrected while watching[/dim]")
+        return
     
-    return successful, failed, errors
+    ordered = sorted(latencies)
+    table = Table(show_header=True, header_style="bold blue", box=box.ROUNDED)
+    table.add_column("Files", justify="right")
+    table.add_column("Median (s)", justify="right")
+    table.add_column("95th pct (s)", justify="right")
+    table.add_column("Max (s)", justify="right")
+    table.add_row(str(len(ordered)), f"{statistics.median(ordered):.1f}",
+                  f"{ordered[min(len(ordered) - 1, int(0.95 * len(ordered)))]:.1f}", f"{ordered[-1]:.1f}")
+    console.print(Panel(table, title="Arrival → Corrected Latency", border_style="blue"))
+
+def format_bytes(size):
+    """Human-readable binary size, e.g. 1.5 GiB."""
+    for unit in ["B", "KiB", "MiB", "GiB"]:
+        if abs(size) < 1024:
+            return f"{size:.1f} {unit}" if unit != "B" else f"{size} B"
+        size /= 1024
+    return f"{size:.1f} TiB"
+
+def parse_memory_size(text):
+    """Parse a memory size such as 512M, 16G or 1.5GiB (binary units) into bytes."""
+    match = re.fullmatch(r"\s*(\d+(?:\.\d*)?)\s*([KMGT]?)(?:I?B)?\s*", text.upper())
+    if not match or float(match.group(1)) <= 0:
+        raise argparse.ArgumentTypeError(f"Invalid memory size '{text}'. Examples: 512M, 16G")
+    return int(float(match.group(1)) * 1024 ** " KMGT".index(match.group(2) or " "))
+
+def parse_jobs(text):
+    """--jobs value: a positive number of jobs or 'auto'."""
+    if text == "auto":
+        return text
+    if not text.isdigit() or int(text) < 1:
+        raise argparse.ArgumentTypeError(f"Invalid job count '{text}'. Use a positive number or 'auto'")
+    return int(text)
 
 def validate_orientation(orientation):
     """Validate orientation string."""
@@ -222,7 +2388,121 @@ def validate_orientation(orientation):
         )
     return orientation.upper()
 
+def uses_afni(plans, deoblique_engine="afni", reorient_engine="afni", watch=False):
+    """
+    Whether any file may run an AFNI stage. Files not planned up front (plans is None,
+    or arriving later with watch) may need every stage.
+    """
+    afni_stages = {stage for stage, engine in (("deoblique", deoblique_engine), ("reorient", reorient_engine))
+                   if engine == "afni"}
+    if plans is None or watch:
+        return bool(afni_stages)
+    return any(afni_stages.intersection(stages) for stages in plans.values())
+
+def runner_available(kind):
+    """Whether the executable behind a runner kind is on PATH."""
+    executable = {"local": "3dresample", "docker": "docker", "apptainer": "apptainer"}[kind]
+    return shutil.which(executable) is not None
+
+def bench_runner(argv=None):
+    """
+    bench-runner subcommand: time tiny 3dresample calls through every available
+    runner so the backend with the least per-call overhead can be picked.
+    """
+    parser = argparse.ArgumentParser(
+        prog=f"{os.path.basename(sys.argv[0])} bench-runner",
+        description="Measure the per-call overhead of each AFNI execution backend on this machine")
+    parser.add_argument("--runners", nargs="+", choices=RUNNERS + ["docker-warm"],
+                       default=RUNNERS + ["docker-warm"],
+                       help="Backends to measure (default: all that are installed)")
+    parser.add_argument("--calls", type=int, default=5,
+                       help="AFNI calls per backend; the first includes image/container start-up (default: 5)")
+    args = parser.parse_args(argv)
+    
+    display_header()
+    table = Table(show_header=True, header_style="bold blue", box=box.ROUNDED)
+    table.add_column("Runner", style="cyan")
+    table.add_column("First call (s)", justify="right")
+    table.add_column("Median call (s)", justify="right")
+    table.add_column("Fastest call (s)", justify="right")
+    
+    with tempfile.TemporaryDirectory(prefix="niwrap_bench_") as temp_dir:
+        # A tiny image keeps the measurement dominated by start-up overhead
+        input_path = os.path.join(temp_dir, "bench_T1w.nii.gz")
+        nib.save(nib.Nifti1Image(np.zeros((8, 8, 8), dtype=np.int16), np.eye(4)), input_path)
+        
+        for name in args.runners:
+            kind, warm = name.split("-")[0], name.endswith("-warm")
+            if not runner_available(kind):
+                table.add_row(name, "[dim]not installed[/dim]", "", "")
+                continue
+            try:
+                runner = make_runner(kind, [temp_dir], warm, data_dir=tempfile.mkdtemp(dir=temp_dir))
+            except ImportError as e:
+                table.add_row(name, f"[dim]{e}[/dim]", "", "")
+                continue
+            niwrap.set_global_runner(runner)
+            latencies = []
+            try:
+                with console.status(f"[bold green]Timing {name}...", spinner="dots"):
+                    for index in range(args.calls):
+                        start = time.perf_counter()
+                        reorient_to_orientation(input_path, os.path.join(temp_dir, f"{name}_{index}.nii.gz"), "RAS")
+                        latencies.append(time.perf_counter() - start)
+            except (niwrap.StyxRuntimeError, OSError) as e:
+                table.add_row(name, f"[red]failed: {str(e).splitlines()[0]}[/red]", "", "")
+                continue
+            finally:
+                if isinstance(runner, WarmContainerRunner):
+                    runner.stop()
+            steady = latencies[1:] or latencies
+            table.add_row(name, f"{latencies[0]:.3f}", f"{statistics.median(steady):.3f}", f"{min(steady):.3f}")
+    
+    console.print(Panel(table, title="Per-call AFNI Overhead", border_style="green"))
+
+def cache_stats(argv=None):
+    """
+    cache-stats subcommand: show the size, hit rate and bytes saved of a --cache
+    directory, accumulated over every run that used it.
+    """
+    parser = argparse.ArgumentParser(
+        prog=f"{os.path.basename(sys.argv[0])} cache-stats",
+        description="Show the usage statistics of a result cache directory")
+    parser.add_argument("cache", help="Cache directory (as passed to --cache)")
+    parser.add_argument("--max-size", type=parse_memory_size,
+                       help="Evict least recently used outputs until the cache fits in this size")
+    args = parser.parse_args(argv)
+    
+    display_header()
+    if not os.path.exists(os.path.join(args.cache, CACHE_INDEX_NAME)):
+        console.print(f"[red]Error: '{args.cache}' is not a result cache directory[/red]")
+        return
+    cache = ResultCache(args.cache, max_size=args.max_size)
+    cache.evict()
+    stats = cache.stats()
+    cache.close()
+    
+    lookups, hits = stats.get("lookups", 0), stats.get("hits", 0)
+    table = Table(show_header=False, box=box.ROUNDED)
+    table.add_column("Property", style="cyan")
+    table.add_column("Value", style="white")
+    table.add_row("Cached outputs", str(stats["entries"]))
+    table.add_row("Cache size", format_bytes(stats["size"]))
+    table.add_row("Lookups", str(lookups))
+    table.add_row("Hits", str(hits))
+    table.add_row("Hit rate", f"{hits / lookups:.1%}" if lookups else "-")
+    table.add_row("Bytes saved", format_bytes(stats.get("bytes_saved", 0)))
+    table.add_row("Evictions", str(stats.get("evictions", 0)))
+    console.print(Panel(table, title=f"Result Cache: {args.cache}", border_style="green"))
+
 def main():
+    if sys.argv[1:2] == ["bench-runner"]:
+        bench_runner(sys.argv[2:])
+        return
+    if sys.argv[1:2] == ["cache-stats"]:
+        cache_stats(sys.argv[2:])
+        return
+    
     parser = argparse.ArgumentParser(
         description="Process T1w NIfTI files to correct headers using AFNI",
         formatter_class=argparse.RawDescriptionHelpFormatter,
@@ -232,6 +2512,10 @@ Examples:
   %(prog)s -d /path/to/dataset -o /path/to/output -j 8
   %(prog)s -d /path/to/dataset --orient RAS
   %(prog)s -d /path/to/dataset --no-confirm
+  %(prog)s -d /path/to/dataset --runner local
+  %(prog)s -d /path/to/dataset --cache /shared/niwrap_cache
+  %(prog)s bench-runner
+  %(prog)s cache-stats /shared/niwrap_cache
 
 Orientation codes (default: LPI):
   L/R = Left/Right, A/P = Anterior/Posterior, I/S = Inferior/Superior
@@ -245,10 +2529,88 @@ Orientation codes (default: LPI):
     parser.add_argument("--orient", "--orientation", type=validate_orientation, 
                        default="LPI", metavar="ORIENT",
                        help="Target orientation (default: LPI). Examples: RAS, LAI, RPI, etc.")
-    parser.add_argument("-j", "--jobs", type=int, default=mp.cpu_count(),
-                       help=f"Number of parallel jobs (default: {mp.cpu_count()})")
+    parser.add_argument("-j", "--jobs", type=parse_jobs,
+                       help="Number of parallel jobs, or 'auto' to tune it from the measured throughput "
+                            "(default: from the CPU affinity mask, cgroup CPU quota and available memory, "
+                            "allowing for AFNI container overhead)")
     parser.add_argument("--no-confirm", action="store_true",
                        help="Skip confirmation prompt")
+    parser.add_argument("--oblique-tolerance", type=float, default=OBLIQUE_TOLERANCE_DEG, metavar="DEG",
+                       help=f"Skip 3dWarp deobliquing when the affine is oblique by at most this many "
+                            f"degrees (default: {OBLIQUE_TOLERANCE_DEG})")
+    parser.add_argument("--deoblique-engine", choices=sorted(DEOBLIQUE_ENGINES), default="afni",
+                       help="Deoblique engine: AFNI 3dWarp (afni, default) or in-process NumPy "
+                            "resampling onto the same cardinal grid (native)")
+    parser.add_argument("--interpolation", choices=INTERPOLATIONS, default="linear",
+                       help="Interpolation used when deobliquing (default: linear)")
+    parser.add_argument("--reorient-engine", choices=sorted(REORIENT_ENGINES), default="afni",
+                       help="Reorientation engine: AFNI 3dresample (afni, default) or in-process "
+                            "axis permutations/flips with nibabel (native)")
+    parser.add_argument("--runner", choices=RUNNERS, default="local",
+                       help="How AFNI is executed: local binaries on PATH (default), Docker (needs styxdocker) "
+                            "or Apptainer (needs styxsingularity). Use '%(prog)s bench-runner' to compare "
+                            "their per-call overhead")
+    parser.add_argument("--warm-containers", action="store_true",
+                       help="Keep one long-lived AFNI container per worker (Docker) instead of "
+                            "starting a container for every AFNI call")
+    parser.add_argument("--batch-size", type=int, default=1, metavar="N",
+                       help="Run the AFNI commands of N files in one container invocation per batch "
+                            "(default: 1, one niwrap call per command)")
+    parser.add_argument("--pipeline", action="store_true",
+                       help="Run files through a staged pipeline: nibabel/NumPy steps in a process pool "
+                            "and AFNI steps in a separately sized thread pool, with queues in between")
+    parser.add_argument("--cpu-workers", type=int, metavar="N",
+                       help="With --pipeline, processes for nibabel/NumPy steps (default: --jobs)")
+    parser.add_argument("--container-workers", type=int, metavar="N",
+                       help="With --pipeline, concurrent AFNI calls (default: --jobs)")
+    parser.add_argument("--queue-depth", type=int, metavar="N",
+                       help="With --pipeline, files that may wait for a worker beyond the ones being "
+                            "processed (default: cpu + container workers)")
+    parser.add_argument("--threads-per-job", type=int, metavar="N",
+                       help="Cap OpenMP/BLAS threads (NumPy in the workers, AFNI in its containers) at N per "
+                            "job (default: library defaults, often one thread per CPU)")
+    parser.add_argument("--max-memory", type=parse_memory_size, metavar="SIZE",
+                       help="Admit files while their estimated peak memory (from the header) fits in SIZE, "
+                            "e.g. 16G; big files then run with fewer peers (default: no limit)")
+    parser.add_argument("--schedule", choices=SCHEDULES, default="fifo",
+                       help="Submission order: discovery order (fifo, default), largest-first to avoid a "
+                            "long tail of big scans, smallest-first, or locality (grouped by directory)")
+    parser.add_argument("--stream", action="store_true",
+                       help="Start processing while the dataset is still being searched, without the "
+                            "up-front file count and header triage")
+    parser.add_argument("--force", action="store_true",
+                       help=f"Process files even when the manifest ({MANIFEST_NAME} in the dataset root, or "
+                            f"the output directory) shows them unchanged since they were processed")
+    parser.add_argument("--resume", action="store_true",
+                       help=f"Skip files committed in the journal ({JOURNAL_NAME} next to the manifest) of an "
+                            f"interrupted run and remove temporary directories left by killed runs "
+                            f"(default: start a new journal)")
+    parser.add_argument("--cache", metavar="DIR",
+                       help="Result cache directory, shareable across datasets: inputs whose content was "
+                            "processed before with the same settings are reflinked (or copied) from it "
+                            "(see '%(prog)s cache-stats DIR')")
+    parser.add_argument("--cache-size", type=parse_memory_size, default=DEFAULT_CACHE_SIZE,
+                       help="Size of the result cache beyond which least recently used outputs are "
+                            "evicted (default: 20G)")
+    parser.add_argument("--cache-hardlink", action="store_true",
+                       help="Hardlink cache hits where they cannot be reflinked instead of copying them. Saves "
+                            "space, but the cache and every output linked from it then share one file: "
+                            "editing one in place changes them all")
+    parser.add_argument("--watch", action="store_true",
+                       help="After processing the dataset, keep the workers running and process new or changed "
+                            "T1w files as they arrive (inotify with the inotify_simple package, polling "
+                            "otherwise) until Ctrl+C, reporting the arrival-to-corrected latency")
+    parser.add_argument("--watch-interval", type=float, default=WATCH_INTERVAL, metavar="SECONDS",
+                       help=f"With --watch, seconds between checks for changes (default: {WATCH_INTERVAL:g})")
+    parser.add_argument("--debounce", type=float, default=WATCH_DEBOUNCE, metavar="SECONDS",
+                       help=f"With --watch, seconds a file must stay unmodified before it is processed, so "
+                            f"files still being copied are left alone (default: {WATCH_DEBOUNCE:g})")
+    parser.add_argument("--header-mode", choices=["stream", "rebuild"], default="stream",
+                       help="How to fix dim0/pixdim[4]: patch the header bytes while streaming the file "
+                            "(stream, default) or rebuild the image through nibabel arrays (rebuild)")
+    parser.add_argument("--no-preserve-dtype", dest="preserve_dtype", action="store_false",
+                       help="With --header-mode rebuild, write scaled values in the 4D→3D step and let "
+                            "nibabel rescale them (default: keep the stored values and their scl_slope/scl_inter)")
     
     args = parser.parse_args()
     
@@ -260,36 +2622,210 @@ Orientation codes (default: LPI):
         console.print(f"[red]Error: Dataset directory '{args.dataset}' does not exist[/red]")
         return
     
-    # Find all T1w files
-    with console.status("[bold green]Searching for T1w files...", spinner="dots"):
-        t1w_pattern = os.path.join(args.dataset, "**", "*T1w.nii.gz")
-        t1w_files = glob.glob(t1w_pattern, recursive=True)
+    # Size the default job count to the CPUs and memory actually available here
+    jobs_reasons = None
+    tuner = None
+    if args.jobs in (None, "auto"):
+        containers = args.runner != "local" and "afni" in (args.deoblique_engine, args.reorient_engine)
+        auto = args.jobs == "auto"
+        args.jobs, jobs_reasons = default_jobs(containers)
+        if auto and not (args.pipeline or args.watch):
+            tuner = ConcurrencyTuner(maximum=2 * args.jobs)
+            jobs_reasons.append(f"auto: tuned between 1 and {tuner.maximum} from the measured throughput")
+        elif auto and args.pipeline:
+            jobs_reasons.append("auto: not tuned with --pipeline, which sizes its pools from this value")
+        elif auto:
+            jobs_reasons.append("auto: not tuned with --watch, whose files arrive in bursts")
     
-    if not t1w_files:
-        console.print(f"[yellow]No T1w files found in {args.dataset}[/yellow]")
+    if args.stream and args.schedule != "fifo":
+        console.print("[red]Error: --schedule needs the whole file list and cannot be combined with --stream[/red]")
+        return
+    if args.watch and (args.stream or args.pipeline):
+        console.print("[red]Error: --watch cannot be combined with --stream or --pipeline[/red]")
         return
+    # Watch from the start, so files arriving during the first pass are not missed
+    watcher = DatasetWatcher(args.dataset) if args.watch else None
+    
+    # Files recorded as processed with the same settings are skipped unless --force
+    version = pipeline_version(args.deoblique_engine, args.reorient_engine, args.interpolation,
+                               args.oblique_tolerance, args.header_mode, args.preserve_dtype)
+    manifest = Manifest(args.dataset, args.orient, version, args.output)
+    unchanged = Counter()
+    
+    # Every final move is journaled; --resume skips the files an interrupted run committed
+    journal_path = os.path.join(args.output or args.dataset, JOURNAL_NAME)
+    committed = {}
+    if args.resume:
+        committed = read_journal(journal_path)
+        removed = clean_orphaned_temp_dirs()
+        if removed:
+            console.print(f"[yellow]Removed {removed} temporary directories left by killed runs[/yellow]")
+        removed = clean_partial_outputs(args.dataset, args.output)
+        if removed:
+            console.print(f"[yellow]Removed {removed} partially written outputs left by killed runs[/yellow]")
+    
+    # Find all T1w files
+    t1w_pattern = os.path.join(args.dataset, "**", "*T1w.nii.gz")
+    if args.stream:
+        # Walk the dataset lazily: processing starts with the first file found, workers plan their own files
+        t1w_files, plans, duplicates, discovered = glob.iglob(t1w_pattern, recursive=True), None, {}, []
+        digests, volumes = {}, {}
+        if not args.force:
+            t1w_files = unprocessed_files(t1w_files, manifest, unchanged)
+        t1w_files = uncommitted_files(t1w_files, committed, unchanged)
+    else:
+        with console.status("[bold green]Searching for T1w files...", spinner="dots"):
+            discovered = t1w_files = glob.glob(t1w_pattern, recursive=True)
+            if not args.force:
+                t1w_files = unprocessed_files(t1w_files, manifest, unchanged)
+            t1w_files = list(uncommitted_files(t1w_files, committed, unchanged))
+        
+        if not t1w_files:
+            if unchanged["committed"]:
+                console.print(f"[green]All {unchanged['committed'] + unchanged['unchanged']} T1w files were "
+                              f"already committed or unchanged, nothing to resume[/green]")
+            elif unchanged["unchanged"]:
+                console.print(f"[green]All {unchanged['unchanged']} T1w files are unchanged since they were "
+                              f"processed (use --force to process them again)[/green]")
+            else:
+                console.print(f"[yellow]No T1w files found in {args.dataset}[/yellow]")
+            if not args.watch:
+                return
+        
+        # Byte-identical copies (e.g. under sourcedata/ and derivatives/) are processed once; the
+        # digests are kept for the cache keys, hashing the remaining files in parallel when caching
+        digests = {}
+        with console.status("[bold green]Finding identical files...", spinner="dots"):
+            t1w_files, duplicates = group_duplicates(t1w_files, args.jobs, digests)
+            if args.cache:
+                hash_files(t1w_files, args.jobs, digests)
+        
+        # Plan the minimal work per file from the headers, keeping their sizes for scheduling
+        volumes = {}
+        with console.status("[bold green]Reading headers...", spinner="dots"):
+            plans = triage_files(t1w_files, args.orient, args.jobs, args.oblique_tolerance, volumes)
+        t1w_files = schedule_files(t1w_files, args.schedule, work=partial(triaged_volume_bytes, volumes))
+    
+    # The container runners come from optional packages, needed only when a file goes through AFNI
+    afni_needed = uses_afni(plans, args.deoblique_engine, args.reorient_engine, args.watch)
+    if afni_needed and args.runner in RUNNER_PACKAGES and not args.warm_containers:
+        try:
+            import_runner_package(args.runner)
+        except ImportError as e:
+            console.print(f"[red]Error: {e}[/red]")
+            return
     
     # Display summary
-    display_summary(args.dataset, t1w_files, args.jobs, args.output, args.orient)
+    copies = sum(map(len, duplicates.values()))
+    runner_text = args.runner + (" (warm)" if args.warm_containers else "") if afni_needed else "Not needed"
+    display_summary(args.dataset, None if args.stream else t1w_files, args.jobs, args.output, args.orient, plans,
+                    args.oblique_tolerance, runner_text,
+                    args.max_memory, jobs_reasons, unchanged["unchanged"] if not args.stream else None,
+                    copies)
     
     # Confirmation prompt
     if not args.no_confirm:
-        if not Confirm.ask(f"Proceed with processing {len(t1w_files)} files to {args.orient} orientation?"):
+        files_text = "all T1w files found" if args.stream else f"{len(t1w_files) + copies} files"
+        if args.watch:
+            files_text += " and then files as they arrive"
+        if not Confirm.ask(f"Proceed with processing {files_text} to {args.orient} orientation?"):
             console.print("[yellow]Operation cancelled.[/yellow]")
             return
         console.print()
     
+    # Directories the AFNI containers need to see: data, output and temp files
+    if args.warm_containers and args.runner != "docker":
+        console.print("[red]Error: --warm-containers requires --runner docker[/red]")
+        return
+    mounts = [args.dataset, tempfile.gettempdir()] + ([args.output] if args.output else [])
+    if args.output:
+        os.makedirs(args.output, exist_ok=True)
+    environ = thread_environment(args.threads_per_job) if args.threads_per_job else None
+    # Workers only get a runner when some file goes through AFNI
+    runner_config = (args.runner, mounts, args.warm_containers, environ) if afni_needed else None
+    
+    pipeline = None
+    if args.pipeline:
+        if args.batch_size > 1:
+            console.print("[red]Error: --batch-size cannot be combined with --pipeline[/red]")
+            return
+        pipeline = (args.cpu_workers or args.jobs, args.container_workers or args.jobs, args.queue_depth)
+    
+    # Outputs are shared between inputs of identical content processed with the same settings
+    # and the same AFNI build
+    cache = None
+    if args.cache:
+        cache = ResultCache(args.cache, f"{args.orient}|{version}|{afni.V_3D_WARP_METADATA.container_image_tag}",
+                            args.cache_size, args.cache_hardlink)
+    
     # Process files
-    start_time = time.time()
-    successful, failed, errors = process_files_with_progress(t1w_files, args.output, args.jobs, args.orient)
-    end_time = time.time()
+    if not args.resume:
+        open(journal_path, "w").close()
+    open_journal(journal_path)
+    executor = None
+    if args.watch:
+        # One pool (and its runners) for the first pass and every file that arrives later
+        executor = concurrent.futures.ProcessPoolExecutor(max_workers=args.jobs, initializer=init_worker,
+                                                          initargs=(runner_config, args.threads_per_job,
+                                                                    journal_path))
+    process = partial(process_files_with_progress, output_dir=args.output, n_jobs=args.jobs,
+                      orientation=args.orient, preserve_dtype=args.preserve_dtype, header_mode=args.header_mode,
+                      reorient_engine=args.reorient_engine, deoblique_engine=args.deoblique_engine,
+                      interpolation=args.interpolation, runner_config=runner_config, batch_size=args.batch_size,
+                      pipeline=pipeline, oblique_tolerance=args.oblique_tolerance, max_memory=args.max_memory,
+                      threads_per_job=args.threads_per_job, tuner=tuner, manifest=manifest,
+                      journal_path=journal_path, cache=cache, executor=executor)
+    # With --watch and nothing to do yet, go straight to watching
+    if t1w_files or not args.watch:
+        start_time = time.time()
+        successful, failed, errors, stage_skips = process(t1w_files, plans=plans, duplicates=duplicates,
+                                                          total=None if args.stream else len(t1w_files) + copies,
+                                                          digests=digests, volumes=volumes)
+        end_time = time.time()
+        
+        if args.stream and not successful + failed + unchanged["unchanged"] + unchanged["committed"]:
+            console.print(f"[yellow]No T1w files found in {args.dataset}[/yellow]")
+        else:
+            # Display results
+            display_results(successful, failed, errors, stage_skips, unchanged["unchanged"])
+            if unchanged["committed"]:
+                console.print(f"[green]Resumed: {unchanged['committed']} files committed by the interrupted "
+                              f"run were skipped[/green]")
+            if tuner is not None:
+                display_tuner_log(tuner)
+            
+            # Processing time
+            processing_time = end_time - start_time
+            console.print(f"\n[dim]Total processing time: {processing_time:.1f} seconds[/dim]")
     
-    # Display results
-    display_results(successful, failed, errors)
+    # Process only what arrives or changes from now on
+    if args.watch:
+        def process_delta(delta, on_result):
+            files = delta if args.force else list(unprocessed_files(delta, manifest, Counter()))
+            if not files:
+                return 0, 0, [], Counter()
+            digests = {}
+            files, duplicates = group_duplicates(files, args.jobs, digests)
+            if args.cache:
+                hash_files(files, args.jobs, digests)
+            volumes = {}
+            plans = triage_files(files, args.orient, args.jobs, args.oblique_tolerance, volumes)
+            files = schedule_files(files, args.schedule, work=partial(triaged_volume_bytes, volumes))
+            return process(files, plans=plans, duplicates=duplicates, on_result=on_result,
+                           total=len(files) + sum(map(len, duplicates.values())), digests=digests, volumes=volumes)
+        
+        for file_path in discovered:
+            watcher.mark(file_path)
+        console.print()
+        latencies = watch_dataset(watcher, process_delta, args.watch_interval, args.debounce)
+        display_latency(latencies)
+        executor.shutdown()
+        watcher.close()
     
-    # Processing time
-    processing_time = end_time - start_time
-    console.print(f"\n[dim]Total processing time: {processing_time:.1f} seconds[/dim]")
+    manifest.close()
+    if cache is not None:
+        cache.close()
+    open_journal(None)
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
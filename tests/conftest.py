@@ -0,0 +1,48 @@
+import os
+import sys
+import shutil
+
+import nibabel as nib
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# AFNI comparisons run only where the binaries are on PATH (through niwrap's LocalRunner)
+requires_afni = pytest.mark.skipif(shutil.which("3dWarp") is None or shutil.which("3dresample") is None,
+                                   reason="AFNI binaries not on PATH")
+
+
+def oblique_affine(angles=(12.0, 5.0, -8.0), zooms=(1.0, 1.1, 1.2), origin=(-20.0, -24.0, -18.0)):
+    """Affine rotated by the given angles (degrees about x, y, z) with the given voxel sizes."""
+    rotation = nib.eulerangles.euler2mat(*np.radians(angles)[::-1])
+    return nib.affines.from_matvec(rotation @ np.diag(zooms), origin)
+
+
+def save_image(path, data, affine):
+    """Save data as a NIfTI image and return its path as a string."""
+    nib.save(nib.Nifti1Image(data, affine), str(path))
+    return str(path)
+
+
+@pytest.fixture
+def smooth_int16():
+    """Smooth int16 volume (a blurred ellipsoid with texture), small enough for fast tests."""
+    shape = (20, 24, 16)
+    grid = np.indices(shape, dtype=np.float32)
+    centre = (np.array(shape, dtype=np.float32) - 1)[:, None, None, None] / 2
+    radius = np.sqrt((((grid - centre) / (0.4 * np.array(shape)[:, None, None, None])) ** 2).sum(axis=0))
+    volume = 800 / (1 + np.exp((radius - 1) * 6)) + 50 * np.sin(grid[0] / 3) * np.cos(grid[1] / 4)
+    return volume.astype(np.int16)
+
+
+@pytest.fixture
+def afni_runner(tmp_path):
+    """Route niwrap calls to the local AFNI binaries for the duration of a test."""
+    import niwrap
+    from niwrap_correct_headers import make_runner
+
+    previous = niwrap.get_global_runner()
+    niwrap.set_global_runner(make_runner("local", data_dir=str(tmp_path / "styx")))
+    yield
+    niwrap.set_global_runner(previous)
@@ -0,0 +1,71 @@
+import os
+
+import niwrap
+import numpy as np
+import pytest
+
+import niwrap_correct_headers as nch
+from conftest import oblique_affine, save_image
+
+# Stand-in for 3dWarp: copies its input to -prefix, and fails on inputs named *bad*
+FAKE_3DWARP = """#!/bin/bash
+prefix=""; last=""
+while [ $# -gt 0 ]; do case "$1" in -prefix) prefix="$2"; shift 2;; -gridset) shift 2;; *) last="$1"; shift;; esac; done
+case "$last" in *bad*) echo "cannot read $last" >&2; exit 2;; esac
+cp "$last" "$prefix"
+"""
+
+
+@pytest.fixture
+def local_runner():
+    previous = niwrap.get_global_runner()
+    niwrap.set_global_runner(niwrap.LocalRunner())
+    yield
+    niwrap.set_global_runner(previous)
+
+
+def test_parse_batch_statuses_ignores_other_output():
+    output = f"starting\n{nch.BATCH_STATUS_MARKER} 0 0\n{nch.BATCH_STATUS_MARKER} oops\n{nch.BATCH_STATUS_MARKER} 2 1\n"
+    assert nch.parse_batch_statuses(output) == {0: 0, 2: 1}
+
+
+def test_script_blocks_stop_at_the_first_failure(tmp_path, local_runner):
+    blocks = {
+        0: [["true"], ["true"]],
+        1: [["sh", "-c", "exit 3"], ["touch", str(tmp_path / "not_reached")]],
+        2: [["echo", "it's logged"]],
+    }
+    lines = ["#!/bin/bash"]
+    for index, commands in blocks.items():
+        lines += nch.afni_script_block(index, commands, str(tmp_path / f"{index}.log"))
+    script_path = tmp_path / "batch.sh"
+    script_path.write_text("\n".join(lines) + "\n")
+
+    output = nch.run_afni_script(str(script_path), [str(tmp_path)])
+    assert nch.parse_batch_statuses(output) == {0: 0, 1: 3, 2: 0}
+    assert not (tmp_path / "not_reached").exists()
+    assert (tmp_path / "2.log").read_text() == "it's logged\n"
+
+
+def test_process_batch_reports_per_file_outcomes(tmp_path, monkeypatch, local_runner):
+    bin_dir = tmp_path / "bin"
+    bin_dir.mkdir()
+    (bin_dir / "3dWarp").write_text(FAKE_3DWARP)
+    os.chmod(bin_dir / "3dWarp", 0o755)
+    monkeypatch.setenv("PATH", f"{bin_dir}{os.pathsep}{os.environ['PATH']}")
+    data = np.arange(4 * 5 * 6, dtype=np.int16).reshape(4, 5, 6)
+    paths = [save_image(tmp_path / f"{name}_T1w.nii.gz", data, oblique_affine()) for name in ("good", "bad")]
+    output_dir = str(tmp_path / "out")
+
+    good, bad = nch.process_batch(paths, {path: ["deoblique"] for path in paths}, output_dir,
+                                  reorient_engine="native")
+    assert good["status"] == "success"
+    assert good["states"][1][2] == nch.file_sha256(os.path.join(output_dir, "good_T1w.nii.gz"))
+    assert bad["status"] == "error"
+    assert "AFNI batch command failed (2)" in bad["error"] and "cannot read" in bad["error"]
+    assert os.listdir(output_dir) == ["good_T1w.nii.gz"]
+
+
+def test_collapse_mounts_drops_nested_directories(tmp_path):
+    paths = [str(tmp_path / "a" / "b"), str(tmp_path / "a"), str(tmp_path / "ab"), str(tmp_path / "a")]
+    assert nch.collapse_mounts(paths) == [str(tmp_path / "a"), str(tmp_path / "ab")]
@@ -0,0 +1,97 @@
+import fcntl
+import os
+
+import pytest
+
+import niwrap_correct_headers as nch
+
+
+@pytest.fixture
+def cache(tmp_path):
+    cache = nch.ResultCache(str(tmp_path / "cache"), "LPI|v1", max_size=None)
+    yield cache
+    cache.close()
+
+
+@pytest.fixture
+def no_reflink(monkeypatch):
+    """Make clone_file fall back as on a filesystem without reflinks."""
+    def ioctl(*args):
+        raise OSError("reflinks not supported")
+    monkeypatch.setattr(fcntl, "ioctl", ioctl)
+
+
+def write(path, content):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_bytes(content)
+    return str(path)
+
+
+def store_output(cache, tmp_path, name, content):
+    """Cache content as the output of an input called name; returns its key."""
+    input_path = write(tmp_path / "inputs" / name, b"input " + name.encode())
+    output_path = write(tmp_path / "outputs" / name, content)
+    key = cache.key(input_path)
+    cache.store(key, output_path, nch.file_sha256(output_path))
+    return key
+
+
+def test_key_depends_on_content_and_settings(cache, tmp_path):
+    first = write(tmp_path / "a" / "x_T1w.nii.gz", b"scan")
+    copy = write(tmp_path / "b" / "y_T1w.nii.gz", b"scan")
+    assert cache.key(first) == cache.key(copy) == cache.key(first, nch.file_sha256(first))
+    other = nch.ResultCache(str(tmp_path / "cache"), "RAS|v1")
+    assert other.key(first) != cache.key(first)
+    other.close()
+
+
+def test_fetch_materializes_a_copy(cache, tmp_path, no_reflink):
+    key = store_output(cache, tmp_path, "x_T1w.nii.gz", b"corrected")
+    input_path = write(tmp_path / "dataset" / "x_T1w.nii.gz", b"input x_T1w.nii.gz")
+    assert cache.fetch(key, input_path) == nch.file_sha256(str(tmp_path / "outputs" / "x_T1w.nii.gz"))
+    with open(input_path, "rb") as f:
+        assert f.read() == b"corrected"
+    assert os.stat(input_path).st_nlink == 1
+    assert [name for name in os.listdir(tmp_path / "dataset") if name.endswith(".tmp")] == []
+
+
+def test_fetch_hardlinks_on_request(tmp_path, no_reflink):
+    cache = nch.ResultCache(str(tmp_path / "cache"), "LPI|v1", hardlink=True)
+    key = store_output(cache, tmp_path, "x_T1w.nii.gz", b"corrected")
+    output_dir = str(tmp_path / "out")
+    cache.fetch(key, str(tmp_path / "inputs" / "x_T1w.nii.gz"), output_dir)
+    assert os.path.samefile(os.path.join(output_dir, "x_T1w.nii.gz"), cache.object_path(key))
+    cache.close()
+
+
+def test_miss_and_stats(cache, tmp_path):
+    input_path = write(tmp_path / "dataset" / "x_T1w.nii.gz", b"input")
+    assert cache.fetch(cache.key(input_path), input_path) is None
+    key = store_output(cache, tmp_path, "x_T1w.nii.gz", b"corrected")
+    cache.fetch(key, input_path)
+    stats = cache.stats()
+    assert (stats["lookups"], stats["hits"], stats["entries"]) == (2, 1, 1)
+    assert stats["size"] == stats["bytes_saved"] == len(b"corrected")
+
+
+def test_least_recently_used_are_evicted(tmp_path):
+    cache = nch.ResultCache(str(tmp_path / "cache"), "LPI|v1", max_size=25)
+    old = store_output(cache, tmp_path, "a_T1w.nii.gz", b"0123456789")
+    used = store_output(cache, tmp_path, "b_T1w.nii.gz", b"0123456789")
+    # Touch the older entry again so the other one is the least recently used
+    cache.fetch(old, str(tmp_path / "inputs" / "a_T1w.nii.gz"), str(tmp_path / "out"))
+    store_output(cache, tmp_path, "c_T1w.nii.gz", b"0123456789")
+
+    stats = cache.stats()
+    assert (stats["entries"], stats["size"], stats["evictions"]) == (2, 20, 1)
+    assert not os.path.exists(cache.object_path(used))
+    assert os.path.exists(cache.object_path(old))
+    cache.close()
+
+
+def test_object_evicted_by_another_run_is_a_miss(cache, tmp_path):
+    key = store_output(cache, tmp_path, "x_T1w.nii.gz", b"corrected")
+    os.remove(cache.object_path(key))
+    input_path = str(tmp_path / "inputs" / "x_T1w.nii.gz")
+    assert cache.fetch(key, input_path) is None
+    assert cache.stats()["entries"] == 0
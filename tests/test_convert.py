@@ -0,0 +1,67 @@
+import nibabel as nib
+import numpy as np
+import pytest
+
+from niwrap_correct_headers import convert_4d_to_3d, read_first_volume, read_header
+
+
+def four_d_image(path, volumes=3):
+    """Save a small int16 4D image and return its path and stored data."""
+    data = np.arange(4 * 5 * 6 * volumes, dtype=np.int16).reshape(4, 5, 6, volumes)
+    img = nib.Nifti1Image(data, np.diag([-1.0, 1.0, 1.0, 1.0]))
+    img.header["pixdim"][4] = 2.5
+    nib.save(img, str(path))
+    return str(path), data
+
+
+@pytest.mark.parametrize("suffix", [".nii.gz", ".nii"])
+def test_convert_keeps_first_volume(tmp_path, suffix):
+    input_path, data = four_d_image(tmp_path / f"input{suffix}")
+    output_path = str(tmp_path / f"output{suffix}")
+    convert_4d_to_3d(input_path, output_path)
+
+    hdr = read_header(output_path)
+    assert (hdr["dim"][0], hdr["dim"][4], hdr["pixdim"][4]) == (3, 1, 1.0)
+    img = nib.load(output_path)
+    np.testing.assert_array_equal(np.asarray(img.dataobj), data[..., 0])
+    np.testing.assert_array_equal(img.affine, nib.load(input_path).affine)
+
+
+def test_only_the_first_volume_is_read(tmp_path):
+    path, data = four_d_image(tmp_path / "input.nii")
+    # Drop the later volumes from the file: reading them would fail
+    with open(path, "r+b") as f:
+        f.truncate(int(read_header(path)["vox_offset"]) + data[..., 0].nbytes)
+    np.testing.assert_array_equal(read_first_volume(nib.load(path)), data[..., 0])
+    convert_4d_to_3d(path, str(tmp_path / "output.nii"))
+    np.testing.assert_array_equal(np.asarray(nib.load(str(tmp_path / "output.nii")).dataobj), data[..., 0])
+
+
+def scaled_image(path, slope=2.0, inter=10.0):
+    """Save a 4D int16 image with scl_slope/scl_inter and return its path and stored data."""
+    data = np.arange(4 * 5 * 6 * 2, dtype=np.int16).reshape(4, 5, 6, 2) - 60
+    img = nib.Nifti1Image(data, np.eye(4))
+    img.header.set_data_dtype(np.int16)
+    img.header.set_slope_inter(slope, inter)
+    nib.save(img, str(path))
+    return str(path), data
+
+
+def test_stored_values_and_scaling_are_preserved(tmp_path):
+    input_path, data = scaled_image(tmp_path / "input.nii.gz")
+    output_path = str(tmp_path / "output.nii.gz")
+    convert_4d_to_3d(input_path, output_path)
+
+    img = nib.load(output_path)
+    assert img.get_data_dtype() == np.int16
+    assert (img.dataobj.slope, img.dataobj.inter) == (2.0, 10.0)
+    np.testing.assert_array_equal(np.asanyarray(img.dataobj.get_unscaled()), data[..., 0])
+
+
+def test_rescaled_values_match(tmp_path):
+    input_path, data = scaled_image(tmp_path / "input.nii.gz")
+    output_path = str(tmp_path / "output.nii.gz")
+    convert_4d_to_3d(input_path, output_path, preserve_dtype=False)
+
+    img = nib.load(output_path)
+    np.testing.assert_allclose(img.get_fdata(), data[..., 0] * 2.0 + 10.0, atol=0.01)
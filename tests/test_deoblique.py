@@ -0,0 +1,115 @@
+import nibabel as nib
+import numpy as np
+import pytest
+
+from conftest import oblique_affine, requires_afni, save_image
+from niwrap_correct_headers import (
+    INTERPOLATIONS,
+    cardinal_affine,
+    deoblique,
+    deoblique_native,
+    deoblique_reorient_native,
+    obliquity_degrees,
+    reorient_native,
+    resample_to_grid,
+)
+
+
+def source_coordinates(source_affine, target_affine, shape):
+    """Source voxel coordinates (3 × voxels) of every target voxel centre."""
+    grid = np.indices(shape).reshape(3, -1)
+    vox_map = np.linalg.inv(source_affine) @ target_affine
+    return vox_map[:3, :3] @ grid + vox_map[:3, 3:4]
+
+
+def inside(coords, shape, margin=0.0):
+    """Mask of coordinates at least margin voxels inside the volume."""
+    upper = np.array(shape)[:, None] - 1 - margin
+    return ((coords >= margin) & (coords <= upper)).all(axis=0)
+
+
+def test_cardinal_affine():
+    affine = oblique_affine()
+    cardinal = cardinal_affine(affine)
+    assert obliquity_degrees(cardinal) == 0
+    assert nib.aff2axcodes(cardinal) == nib.aff2axcodes(affine)
+    np.testing.assert_allclose(nib.affines.voxel_sizes(cardinal), nib.affines.voxel_sizes(affine))
+    np.testing.assert_array_equal(cardinal[:3, 3], affine[:3, 3])
+
+
+@pytest.mark.parametrize("interpolation, order", [("nn", 0), ("linear", 1)])
+def test_resample_matches_map_coordinates(smooth_int16, interpolation, order):
+    ndimage = pytest.importorskip("scipy.ndimage")
+    data = smooth_int16.astype(np.float32)
+    source = oblique_affine()
+    target = cardinal_affine(source)
+    resampled = resample_to_grid(data, source, target, interpolation)
+
+    coords = source_coordinates(source, target, data.shape)
+    expected = ndimage.map_coordinates(data, coords, order=order, mode="constant", cval=0.0)
+    mask = inside(coords, data.shape)
+    assert mask.mean() > 0.5
+    np.testing.assert_allclose(resampled.reshape(-1)[mask], expected[mask], rtol=1e-5, atol=1e-2)
+    # Points outside the source are zero
+    assert not resampled.reshape(-1)[~inside(coords, data.shape, margin=-1.0)].any()
+
+
+def test_cubic_reproduces_cubic_polynomials():
+    shape = (12, 14, 10)
+    i, j, k = np.indices(shape, dtype=np.float64) / 10
+    data = (1 + i - 2 * j ** 2 + 0.5 * k ** 3 + i * j * k - i ** 3 * k ** 2).astype(np.float32)
+    source = np.eye(4)
+    target = oblique_affine(origin=(0.3, -0.2, 0.4), zooms=(1.0, 1.0, 1.0))
+    resampled = resample_to_grid(data, source, target, "cubic")
+
+    coords = source_coordinates(source, target, shape)
+    x, y, z = coords / 10
+    expected = 1 + x - 2 * y ** 2 + 0.5 * z ** 3 + x * y * z - x ** 3 * z ** 2
+    # All four taps per axis must fall inside the volume
+    mask = inside(coords, shape, margin=1.0)
+    assert mask.sum() > 100
+    np.testing.assert_allclose(resampled.reshape(-1)[mask], expected[mask], atol=1e-4)
+
+
+@pytest.mark.parametrize("interpolation", INTERPOLATIONS)
+def test_deoblique_native_output(smooth_int16, tmp_path, interpolation):
+    input_path = save_image(tmp_path / "input.nii.gz", smooth_int16, oblique_affine())
+    output_path = str(tmp_path / "output.nii.gz")
+    deoblique_native(input_path, output_path, interpolation)
+
+    img = nib.load(output_path)
+    assert img.shape == smooth_int16.shape
+    assert img.get_data_dtype() == np.int16
+    np.testing.assert_allclose(img.affine, cardinal_affine(nib.load(input_path).affine), atol=1e-5)
+
+
+@pytest.mark.parametrize("orientation", ["LPI", "RAS", "ASL", "SPR"])
+@pytest.mark.parametrize("interpolation", INTERPOLATIONS)
+def test_fused_pass_equals_two_steps(smooth_int16, tmp_path, orientation, interpolation):
+    input_path = save_image(tmp_path / "input.nii.gz", smooth_int16, oblique_affine())
+    deobliqued_path = str(tmp_path / "deobliqued.nii.gz")
+    two_step_path, fused_path = str(tmp_path / "two_step.nii.gz"), str(tmp_path / "fused.nii.gz")
+    deoblique_native(input_path, deobliqued_path, interpolation)
+    reorient_native(deobliqued_path, two_step_path, orientation)
+    deoblique_reorient_native(input_path, fused_path, orientation, interpolation)
+
+    two_step, fused = nib.load(two_step_path), nib.load(fused_path)
+    assert fused.shape == two_step.shape
+    np.testing.assert_array_equal(np.asarray(fused.dataobj), np.asarray(two_step.dataobj))
+    np.testing.assert_allclose(fused.affine, two_step.affine, atol=1e-5)
+    assert fused.header.get_dim_info() == two_step.header.get_dim_info()
+
+
+@requires_afni
+@pytest.mark.parametrize("interpolation", INTERPOLATIONS)
+def test_deoblique_native_matches_3dwarp(smooth_int16, tmp_path, afni_runner, interpolation):
+    input_path = save_image(tmp_path / "input.nii.gz", smooth_int16, oblique_affine())
+    afni_path, native_path = str(tmp_path / "afni.nii.gz"), str(tmp_path / "native.nii.gz")
+    deoblique(input_path, afni_path, interpolation)
+    deoblique_native(input_path, native_path, interpolation)
+
+    afni_img, native_img = nib.load(afni_path), nib.load(native_path)
+    afni_data = afni_img.get_fdata().squeeze()
+    rel_rms = np.sqrt(np.mean((afni_data - native_img.get_fdata()) ** 2)) / np.ptp(afni_data)
+    assert rel_rms <= 0.01
+    np.testing.assert_allclose(afni_img.affine, native_img.affine, atol=1e-3)
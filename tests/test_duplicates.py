@@ -0,0 +1,66 @@
+import os
+
+import niwrap_correct_headers as nch
+
+
+def write(path, content):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_bytes(content)
+    return str(path)
+
+
+def test_group_duplicates_keeps_first_of_each_content(tmp_path):
+    first = write(tmp_path / "sourcedata" / "a_T1w.nii.gz", b"scan a")
+    other = write(tmp_path / "b_T1w.nii.gz", b"scan b")
+    copy = write(tmp_path / "derivatives" / "a_T1w.nii.gz", b"scan a")
+    # Same size as the others, different content
+    lookalike = write(tmp_path / "c_T1w.nii.gz", b"scan c")
+    alone = write(tmp_path / "d_T1w.nii.gz", b"a longer scan")
+
+    digests = {}
+    unique, duplicates = nch.group_duplicates([first, other, copy, lookalike, alone], 2, digests)
+    assert unique == [first, other, lookalike, alone]
+    assert duplicates == {first: [copy]}
+    # Only files sharing a size are hashed
+    assert set(digests) == {first, other, copy, lookalike}
+    assert digests[first] == digests[copy] == nch.file_sha256(first)
+
+
+def test_group_duplicates_keeps_unreadable_files(tmp_path):
+    # They fail later in their worker, with the error in the results
+    present = write(tmp_path / "a_T1w.nii.gz", b"scan")
+    missing = str(tmp_path / "missing_T1w.nii.gz")
+    assert nch.group_duplicates([present, missing], 1) == ([present, missing], {})
+
+
+def test_copy_output_clones_and_journals(tmp_path):
+    source = write(tmp_path / "a" / "x_T1w.nii.gz", b"corrected")
+    duplicate = write(tmp_path / "b" / "y_T1w.nii.gz", b"original")
+    journal_path = str(tmp_path / nch.JOURNAL_NAME)
+    nch.open_journal(journal_path)
+    try:
+        nch.copy_output(source, duplicate)
+    finally:
+        nch.open_journal(None)
+
+    with open(duplicate, "rb") as f:
+        assert f.read() == b"corrected"
+    assert not os.path.samefile(source, duplicate)
+    assert nch.read_journal(journal_path) == {duplicate: "commit"}
+
+
+def test_copy_output_to_same_output_file_is_journaled(tmp_path):
+    # Identical inputs with the same name share one file in the output directory
+    source = write(tmp_path / "sourcedata" / "x_T1w.nii.gz", b"scan")
+    duplicate = write(tmp_path / "derivatives" / "x_T1w.nii.gz", b"scan")
+    output_dir = str(tmp_path / "out")
+    write(tmp_path / "out" / "x_T1w.nii.gz", b"corrected")
+    journal_path = str(tmp_path / nch.JOURNAL_NAME)
+    nch.open_journal(journal_path)
+    try:
+        nch.copy_output(source, duplicate, output_dir)
+    finally:
+        nch.open_journal(None)
+
+    assert sorted(os.listdir(output_dir)) == ["x_T1w.nii.gz"]
+    assert nch.read_journal(journal_path) == {duplicate: "commit"}
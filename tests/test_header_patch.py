@@ -0,0 +1,42 @@
+import nibabel as nib
+import numpy as np
+import pytest
+
+from niwrap_correct_headers import patch_header_streaming, read_header
+
+
+def four_d_image(path, volumes=3):
+    """Save a small int16 4D image and return its path and data."""
+    data = np.arange(4 * 5 * 6 * volumes, dtype=np.int16).reshape(4, 5, 6, volumes)
+    img = nib.Nifti1Image(data, np.diag([-1.0, -1.0, 1.0, 1.0]))
+    img.header.set_xyzt_units("mm", "sec")
+    img.header["pixdim"][4] = 2.5
+    nib.save(img, str(path))
+    return str(path), data
+
+
+@pytest.mark.parametrize("suffix", [".nii.gz", ".nii"])
+def test_patch_header_streaming_keeps_first_volume(tmp_path, suffix):
+    input_path, data = four_d_image(tmp_path / f"input{suffix}")
+    output_path = str(tmp_path / f"output{suffix}")
+    patch_header_streaming(input_path, output_path)
+
+    hdr = read_header(output_path)
+    assert hdr["dim"][0] == 3
+    assert hdr["dim"][4] == 1
+    assert hdr["pixdim"][4] == 1.0
+    img = nib.load(output_path)
+    assert img.shape == data.shape[:3]
+    np.testing.assert_array_equal(np.asarray(img.dataobj), data[..., 0])
+    # The input is left alone
+    assert nib.load(input_path).shape == data.shape
+
+
+def test_patch_header_streaming_in_place_truncates_later_volumes(tmp_path):
+    path, data = four_d_image(tmp_path / "image.nii")
+    patch_header_streaming(path, path)
+
+    img = nib.load(path)
+    assert img.shape == data.shape[:3]
+    np.testing.assert_array_equal(np.asarray(img.dataobj), data[..., 0])
+    assert (tmp_path / "image.nii").stat().st_size == int(read_header(path)["vox_offset"]) + data[..., 0].nbytes
@@ -0,0 +1,96 @@
+import json
+import os
+from collections import Counter
+
+import niwrap_correct_headers as nch
+
+
+def test_resume_after_torn_line_keeps_new_events(tmp_path):
+    path = str(tmp_path / nch.JOURNAL_NAME)
+    done, torn, resumed = (str(tmp_path / name) for name in ("a_T1w.nii.gz", "b_T1w.nii.gz", "c_T1w.nii.gz"))
+    with open(path, "w") as f:
+        f.write(json.dumps({"event": "commit", "file": done}) + "\n")
+        # Killed halfway through writing b's commit
+        f.write(json.dumps({"event": "start", "file": torn}) + "\n" + '{"event": "comm')
+
+    nch.open_journal(path)
+    try:
+        nch._journal.append("start", resumed)
+        nch._journal.append("commit", resumed)
+    finally:
+        nch.open_journal(None)
+
+    with open(path) as f:
+        lines = f.read().splitlines()
+    assert lines[2] == '{"event": "comm'
+    assert [json.loads(line)["event"] for line in lines[3:]] == ["start", "commit"]
+    assert nch.read_journal(path) == {done: "commit", torn: "start", resumed: "commit"}
+
+
+def test_intact_journal_is_appended_without_blank_lines(tmp_path):
+    path = str(tmp_path / nch.JOURNAL_NAME)
+    for name in ("a", "b"):
+        journal = nch.Journal(path)
+        journal.append("commit", str(tmp_path / name))
+        journal.close()
+    with open(path) as f:
+        assert len(f.read().splitlines()) == 2
+    assert set(nch.read_journal(path).values()) == {"commit"}
+
+
+def test_read_journal_missing_file(tmp_path):
+    assert nch.read_journal(str(tmp_path / "missing.jsonl")) == {}
+
+
+def test_uncommitted_files_skips_only_commits(tmp_path):
+    files = [str(tmp_path / name) for name in ("a", "b", "c")]
+    events = {os.path.abspath(files[0]): "commit", os.path.abspath(files[1]): "start"}
+    skipped = Counter()
+    assert list(nch.uncommitted_files(files, events, skipped)) == files[1:]
+    assert skipped["committed"] == 1
+
+
+def test_finalize_output_journals_the_move(tmp_path):
+    input_path = str(tmp_path / "sub-01_T1w.nii.gz")
+    intermediate = str(tmp_path / "temp_final.nii.gz")
+    for path, content in ((input_path, b"original"), (intermediate, b"corrected")):
+        with open(path, "wb") as f:
+            f.write(content)
+    journal_path = str(tmp_path / nch.JOURNAL_NAME)
+    nch.open_journal(journal_path)
+    try:
+        nch.finalize_output(intermediate, input_path)
+    finally:
+        nch.open_journal(None)
+
+    with open(input_path, "rb") as f:
+        assert f.read() == b"corrected"
+    assert not os.path.exists(intermediate)
+    with open(journal_path) as f:
+        assert [json.loads(line)["event"] for line in f] == ["start", "commit"]
+    assert nch.read_journal(journal_path) == {input_path: "commit"}
+
+
+def test_no_op_in_place_is_committed_without_writing(tmp_path):
+    input_path = str(tmp_path / "sub-01_T1w.nii.gz")
+    with open(input_path, "wb") as f:
+        f.write(b"already correct")
+    mtime_ns = os.stat(input_path).st_mtime_ns
+    journal_path = str(tmp_path / nch.JOURNAL_NAME)
+    nch.open_journal(journal_path)
+    try:
+        nch.finalize_output(input_path, input_path)
+    finally:
+        nch.open_journal(None)
+    assert os.stat(input_path).st_mtime_ns == mtime_ns
+    assert nch.read_journal(journal_path) == {input_path: "commit"}
+
+
+def test_clean_partial_outputs_removes_only_temporaries(tmp_path):
+    anat = tmp_path / "sub-01" / "anat"
+    anat.mkdir(parents=True)
+    names = ["sub-01_T1w.nii.gz", "sub-01_T1w.nii.gz.1a2b3c4d.tmp", "notes.tmp"]
+    for name in names:
+        (anat / name).write_bytes(b"")
+    assert nch.clean_partial_outputs(str(tmp_path), None) == 1
+    assert sorted(os.listdir(anat)) == ["notes.tmp", "sub-01_T1w.nii.gz"]
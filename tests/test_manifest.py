@@ -0,0 +1,85 @@
+import os
+from collections import Counter
+
+import pytest
+
+import niwrap_correct_headers as nch
+
+
+@pytest.fixture
+def dataset(tmp_path):
+    directory = tmp_path / "dataset"
+    directory.mkdir()
+    path = directory / "sub-01_T1w.nii.gz"
+    path.write_bytes(b"corrected scan")
+    return str(directory), str(path)
+
+
+def open_manifest(dataset, orientation="LPI", version="v1", output_dir=None):
+    return nch.Manifest(dataset, orientation, version, output_dir)
+
+
+def test_recorded_file_is_processed_across_runs(dataset):
+    root, path = dataset
+    manifest = open_manifest(root)
+    assert not manifest.is_processed(path)
+    manifest.record(path, nch.manifest_states(path))
+    manifest.close()
+
+    manifest = open_manifest(root)
+    assert manifest.is_processed(path)
+    skipped = Counter()
+    assert list(nch.unprocessed_files([path], manifest, skipped)) == []
+    assert skipped["unchanged"] == 1
+    manifest.close()
+
+
+@pytest.mark.parametrize("orientation, version", [("RAS", "v1"), ("LPI", "v2")])
+def test_other_settings_invalidate(dataset, orientation, version):
+    root, path = dataset
+    manifest = open_manifest(root)
+    manifest.record(path, nch.manifest_states(path))
+    manifest.close()
+    assert not open_manifest(root, orientation, version).is_processed(path)
+
+
+def test_modified_output_invalidates(dataset):
+    root, path = dataset
+    manifest = open_manifest(root)
+    manifest.record(path, nch.manifest_states(path))
+    with open(path, "wb") as f:
+        f.write(b"replaced scan!")
+    assert not manifest.is_processed(path)
+
+
+def test_touched_output_matches_by_content(dataset):
+    root, path = dataset
+    manifest = open_manifest(root)
+    manifest.record(path, nch.manifest_states(path))
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+    assert manifest.is_processed(path)
+    with open(path, "r+b") as f:
+        f.write(b"C")
+    assert not manifest.is_processed(path)
+
+
+def test_output_directory_checks_input_and_output(dataset, tmp_path):
+    root, path = dataset
+    output_dir = str(tmp_path / "out")
+    os.makedirs(output_dir)
+    with open(os.path.join(output_dir, os.path.basename(path)), "wb") as f:
+        f.write(b"output")
+    manifest = open_manifest(root, output_dir=output_dir)
+    states = nch.manifest_states(path, output_dir)
+    assert states[0][2] == nch.file_sha256(path) != states[1][2]
+    manifest.record(path, states)
+    assert manifest.is_processed(path)
+    os.remove(os.path.join(output_dir, os.path.basename(path)))
+    assert not manifest.is_processed(path)
+
+
+def test_in_place_states_reuse_the_output_digest(dataset):
+    _, path = dataset
+    input_state, output_state = nch.manifest_states(path, output_sha256="known")
+    assert input_state == output_state == (os.path.getsize(path), os.stat(path).st_mtime_ns, "known")
@@ -0,0 +1,63 @@
+import nibabel as nib
+import numpy as np
+import pytest
+
+from conftest import requires_afni, save_image
+from niwrap_correct_headers import afni_to_axcodes, reorient_native, reorient_to_orientation, validate_orientation
+
+# The 24 orientation codes accepted by --orient (see validate_orientation)
+ALL_ORIENTATIONS = [
+    "RPI", "LPI", "RAI", "LAI", "RPS", "LPS", "RAS", "LAS",
+    "IPR", "IPL", "IAR", "IAL", "SPR", "SPL", "SAR", "SAL",
+    "PIR", "PIL", "AIR", "AIL", "PSR", "PSL", "ASR", "ASL",
+]
+
+# Voxel-to-world matrices of the inputs: cardinal but starting from different orientations
+START_AFFINES = {
+    "RAS": np.diag([1.0, 1.1, 1.2, 1.0]),
+    "ASL": np.array([[0, 0, -1.2, 90], [1.0, 0, 0, -100], [0, 1.1, 0, -60], [0, 0, 0, 1]]),
+}
+
+
+@pytest.fixture(params=list(START_AFFINES), ids=list(START_AFFINES))
+def random_image(request, tmp_path):
+    data = np.random.default_rng(0).integers(0, 1000, size=(5, 6, 7), dtype=np.int16)
+    affine = START_AFFINES[request.param]
+    return save_image(tmp_path / "input.nii.gz", data, affine), data, affine
+
+
+def test_all_orientations_are_accepted():
+    assert [validate_orientation(orientation) for orientation in ALL_ORIENTATIONS] == ALL_ORIENTATIONS
+
+
+@pytest.mark.parametrize("orientation", ALL_ORIENTATIONS)
+def test_reorient_native_keeps_values_at_their_world_position(random_image, tmp_path, orientation):
+    input_path, data, affine = random_image
+    output_path = str(tmp_path / "output.nii.gz")
+    reorient_native(input_path, output_path, orientation)
+
+    img = nib.load(output_path)
+    assert nib.aff2axcodes(img.affine) == afni_to_axcodes(orientation)
+    out = np.asarray(img.dataobj)
+    assert out.dtype == data.dtype
+    assert sorted(out.shape) == sorted(data.shape)
+
+    # Every output voxel maps back onto the input voxel at the same world position
+    indices = np.indices(out.shape).reshape(3, -1)
+    source = nib.affines.apply_affine(np.linalg.inv(affine) @ img.affine, indices.T)
+    np.testing.assert_allclose(source, np.rint(source), atol=1e-4)
+    source = np.rint(source).astype(int).T
+    np.testing.assert_array_equal(out[tuple(indices)], data[tuple(source)])
+
+
+@requires_afni
+@pytest.mark.parametrize("orientation", ["LPI", "RAS", "ASL"])
+def test_reorient_native_matches_3dresample(random_image, tmp_path, afni_runner, orientation):
+    input_path, _, _ = random_image
+    afni_path, native_path = str(tmp_path / "afni.nii.gz"), str(tmp_path / "native.nii.gz")
+    reorient_to_orientation(input_path, afni_path, orientation)
+    reorient_native(input_path, native_path, orientation)
+
+    afni_img, native_img = nib.load(afni_path), nib.load(native_path)
+    np.testing.assert_array_equal(afni_img.get_fdata().squeeze(), native_img.get_fdata())
+    np.testing.assert_allclose(afni_img.affine, native_img.affine, atol=1e-3)
@@ -0,0 +1,105 @@
+import os
+
+import pytest
+
+import niwrap_correct_headers as nch
+
+GIB = 1024 ** 3
+
+
+@pytest.fixture
+def machine(tmp_path, monkeypatch):
+    """
+    Fake cgroup filesystem under tmp_path and fake /proc files: set
+    machine.proc[path] to the file's contents and write cgroup files with machine.write.
+    """
+    class Machine:
+        proc = {"/proc/meminfo": f"MemTotal: {32 * GIB // 1024} kB\nMemAvailable: {16 * GIB // 1024} kB"}
+
+        @staticmethod
+        def write(relative_path, content):
+            path = tmp_path / relative_path
+            path.parent.mkdir(parents=True, exist_ok=True)
+            path.write_text(content + "\n")
+
+    read_text = nch._read_text
+    monkeypatch.setattr(nch, "_read_text", lambda path: Machine.proc.get(path) if path in Machine.proc
+                        else read_text(path))
+    monkeypatch.setattr(nch, "CGROUP_ROOT", str(tmp_path))
+    monkeypatch.setattr(os, "sched_getaffinity", lambda pid: set(range(8)), raising=False)
+    return Machine
+
+
+def cgroup_dirs(controller=None):
+    return [os.path.normpath(directory) for directory in nch.cgroup_dirs(controller)]
+
+
+def test_read_meminfo(machine):
+    machine.proc["/proc/meminfo"] = "MemTotal:       2048 kB\nHugePages_Total:       4\nbogus line"
+    assert nch.read_meminfo() == {"MemTotal": 2048 * 1024, "HugePages_Total": 4}
+
+
+def test_cgroup_v2_limits(machine, tmp_path):
+    machine.proc["/proc/self/cgroup"] = "0::/system.slice/job"
+    machine.write("cgroup.controllers", "cpu memory")
+    machine.write("system.slice/job/cpu.max", "max 100000")
+    machine.write("system.slice/cpu.max", "150000 100000")
+    machine.write("system.slice/job/memory.max", str(4 * GIB))
+    machine.write("system.slice/job/memory.current", str(GIB))
+    machine.write("system.slice/memory.max", "max")
+    machine.write("system.slice/memory.current", str(GIB))
+
+    assert cgroup_dirs() == [str(tmp_path / "system.slice/job"), str(tmp_path / "system.slice"), str(tmp_path)]
+    # The parent's quota applies to the child
+    assert nch.cgroup_cpu_limit() == 1.5
+    assert nch.available_memory() == 3 * GIB
+
+
+def test_cgroup_v2_in_a_container(machine, tmp_path):
+    # The host's cgroup path is not visible below the container's cgroup mount
+    machine.proc["/proc/self/cgroup"] = "0::/kubepods/pod1/abc"
+    machine.write("cgroup.controllers", "cpu memory")
+    machine.write("cpu.max", "50000 100000")
+    assert cgroup_dirs() == [str(tmp_path)]
+    assert nch.cgroup_cpu_limit() == 0.5
+
+
+def test_cgroup_v1_limits(machine, tmp_path):
+    machine.proc["/proc/self/cgroup"] = "5:memory:/docker/abc\n4:cpu,cpuacct:/docker/abc\n1:name=systemd:/docker/abc"
+    machine.write("cpu/docker/abc/cpu.cfs_quota_us", "200000")
+    machine.write("cpu/docker/abc/cpu.cfs_period_us", "100000")
+    # No quota
+    machine.write("cpu/cpu.cfs_quota_us", "-1")
+    machine.write("cpu/cpu.cfs_period_us", "100000")
+    machine.write("memory/docker/abc/memory.limit_in_bytes", str(2 * GIB))
+    machine.write("memory/docker/abc/memory.usage_in_bytes", str(GIB // 2))
+
+    assert cgroup_dirs("cpu") == [str(tmp_path / "cpu/docker/abc"), str(tmp_path / "cpu/docker"), str(tmp_path / "cpu")]
+    assert nch.cgroup_cpu_limit() == 2
+    assert nch.available_memory() == GIB + GIB // 2
+
+
+def test_no_cgroup_limits(machine):
+    machine.proc["/proc/self/cgroup"] = ""
+    assert nch.cgroup_cpu_limit() is None
+    assert nch.available_memory() == 16 * GIB
+
+
+def test_default_jobs_from_cpu_quota(machine):
+    machine.proc["/proc/self/cgroup"] = "0::/"
+    machine.write("cgroup.controllers", "cpu")
+    machine.write("cpu.max", "500000 100000")
+    jobs, reasons = nch.default_jobs(containers=True)
+    assert jobs == 4
+    assert reasons[:2] == ["8 CPUs in the affinity mask", "cgroup CPU quota of 5 CPUs"]
+    assert nch.default_jobs(containers=False)[0] == 5
+
+
+def test_default_jobs_from_memory(machine):
+    machine.proc["/proc/self/cgroup"] = "0::/"
+    machine.write("cgroup.controllers", "memory")
+    machine.write("memory.max", str(3 * GIB))
+    machine.write("memory.current", "0")
+    jobs, reasons = nch.default_jobs(containers=False)
+    assert jobs == 3
+    assert reasons[-1].endswith("→ 3 jobs")
@@ -0,0 +1,126 @@
+import concurrent.futures
+
+import nibabel as nib
+import numpy as np
+
+import niwrap_correct_headers as nch
+
+
+class InstantSubmitter:
+    """submit() for submit_bounded that completes each item at once, tracking how many were in flight."""
+
+    def __init__(self):
+        self.submitted = []
+        self.finished = 0
+        self.most_in_flight = 0
+
+    def __call__(self, item):
+        self.submitted.append(item)
+        self.most_in_flight = max(self.most_in_flight, len(self.submitted) - self.finished)
+        future = concurrent.futures.Future()
+        future.set_result(item * 10)
+        return future
+
+    def run(self, items, window, **kwargs):
+        results = []
+        for item, future in nch.submit_bounded(self, items, window, **kwargs):
+            self.finished += 1
+            results.append((item, future.result()))
+        return results
+
+
+def test_submit_bounded_keeps_window_in_flight():
+    submitter = InstantSubmitter()
+    results = submitter.run(range(10), 3)
+    assert sorted(results) == [(item, item * 10) for item in range(10)]
+    assert submitter.submitted == list(range(10))
+    assert submitter.most_in_flight == 3
+
+
+def test_submit_bounded_pulls_items_lazily():
+    pulled = []
+
+    def items():
+        for item in range(100):
+            pulled.append(item)
+            yield item
+
+    submitter = InstantSubmitter()
+    for _ in nch.submit_bounded(submitter, items(), 4):
+        break
+    assert len(pulled) <= 5
+
+
+def test_submit_bounded_rereads_a_callable_window():
+    submitter = InstantSubmitter()
+    submitter.run(range(10), lambda: 1 if len(submitter.submitted) < 3 else 4)
+    assert submitter.most_in_flight == 4
+
+
+def test_submit_bounded_empty():
+    assert InstantSubmitter().run([], 4) == []
+
+
+def test_memory_budget_admits_what_fits():
+    budget = nch.MemoryBudget(100)
+    assert budget.fits(100)
+    budget.reserve(60)
+    assert budget.fits(40) and not budget.fits(41)
+    budget.release(60)
+    # Larger than the whole limit: runs, but only alone
+    assert budget.fits(500)
+    budget.reserve(500)
+    assert not budget.fits(1)
+    assert budget.peak == 500
+
+
+def test_memory_budget_without_limit_only_accounts():
+    budget = nch.MemoryBudget()
+    budget.reserve(10 ** 12)
+    assert budget.fits(10 ** 12)
+    budget.reserve(5)
+    assert (budget.reserved, budget.peak) == (10 ** 12 + 5, 10 ** 12 + 5)
+
+
+def test_submit_bounded_stays_within_the_budget():
+    costs = [40, 70, 30, 200, 10, 60]
+    budget = nch.MemoryBudget(100)
+    reserved_at_submission = []
+
+    def submit(item):
+        reserved_at_submission.append(budget.reserved)
+        future = concurrent.futures.Future()
+        future.set_result(None)
+        return future
+
+    done = [item for item, _ in nch.submit_bounded(submit, range(len(costs)), 4, costs.__getitem__, budget)]
+    assert sorted(done) == list(range(len(costs)))
+    assert budget.reserved == 0
+    # Reserved including the submitted item: the oversized one ran alone, the others within the limit
+    assert reserved_at_submission[3] == 200
+    assert all(reserved <= 100 for index, reserved in enumerate(reserved_at_submission) if index != 3)
+    assert budget.peak == 200
+
+
+def test_estimate_memory_caps_resampling_temporaries():
+    voxels, itemsize = 512 ** 3, 2
+    estimate = nch.estimate_memory((voxels, itemsize), ["deoblique"], deoblique_engine="native")
+    assert estimate == voxels * (2 * itemsize + 8) + nch.RESAMPLE_SLAB_VOXELS * nch.RESAMPLE_SLAB_BYTES_PER_VOXEL
+    # A small volume is resampled in one slab
+    small = nch.estimate_memory((500_000, itemsize), ["deoblique"], deoblique_engine="native")
+    assert small == 500_000 * (2 * itemsize + 8 + nch.RESAMPLE_SLAB_BYTES_PER_VOXEL)
+
+
+def test_estimate_memory_is_the_hungriest_stage():
+    volume = (1_000_000, 2)
+    assert nch.estimate_memory(volume, []) == nch.STREAM_CHUNK_SIZE
+    assert nch.estimate_memory(volume, ["4d_to_3d", "reorient"], header_mode="rebuild",
+                               reorient_engine="native") == 1_000_000 * 2 * 2
+    assert nch.estimate_memory(volume, ["4d_to_3d", "deoblique", "reorient"]) == 1_000_000 * 6 * 2
+
+
+def test_volume_info_ignores_extra_volumes():
+    hdr = nib.Nifti1Header()
+    hdr.set_data_dtype(np.int16)
+    hdr.set_data_shape((10, 20, 30, 12))
+    assert nch.volume_info(hdr) == (6000, 2)
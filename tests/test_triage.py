@@ -0,0 +1,36 @@
+import numpy as np
+import pytest
+
+from conftest import oblique_affine, save_image
+from niwrap_correct_headers import STAGE_LABELS, obliquity_degrees, plan_stages, read_header, triage_files
+
+
+def test_plan_stages_all(tmp_path):
+    hdr = read_header(save_image(tmp_path / "input.nii.gz", np.zeros((4, 5, 6, 2), np.int16), oblique_affine()))
+    assert plan_stages(hdr, "RAI") == ["4d_to_3d", "deoblique", "reorient"]
+
+
+def test_plan_stages_nothing_to_do(tmp_path):
+    # RAS voxel axes are LPI in AFNI's naming
+    hdr = read_header(save_image(tmp_path / "ras.nii.gz", np.zeros((4, 5, 6), np.int16), np.eye(4)))
+    assert plan_stages(hdr, "LPI") == []
+    assert plan_stages(hdr, "RAI") == ["reorient"]
+
+
+def test_plan_stages_oblique_tolerance(tmp_path):
+    affine = oblique_affine(angles=(0.3, 0.0, 0.0), zooms=(1.0, 1.0, 1.0))
+    hdr = read_header(save_image(tmp_path / "tilted.nii.gz", np.zeros((4, 5, 6), np.int16), affine))
+    assert plan_stages(hdr, "LPI") == ["deoblique"]
+    assert plan_stages(hdr, "LPI", oblique_tolerance=0.5) == []
+    assert obliquity_degrees(hdr.get_best_affine()) == pytest.approx(0.3, abs=1e-3)
+
+
+def test_triage_files(tmp_path):
+    four_d = save_image(tmp_path / "a_T1w.nii.gz", np.zeros((4, 5, 6, 2), np.int16), np.eye(4))
+    correct = save_image(tmp_path / "b_T1w.nii.gz", np.zeros((4, 5, 6), np.float32), np.eye(4))
+    missing = str(tmp_path / "c_T1w.nii.gz")
+    volumes = {}
+    plans = triage_files([four_d, correct, missing], "LPI", 2, volumes=volumes)
+    # Unreadable files are planned for every stage, to fail in their worker
+    assert plans == {four_d: ["4d_to_3d"], correct: [], missing: list(STAGE_LABELS)}
+    assert volumes == {four_d: (120, 2), correct: (120, 4)}
@@ -0,0 +1,72 @@
+import pytest
+
+import niwrap_correct_headers as nch
+
+PLENTY_OF_MEMORY = {"MemTotal": 100, "MemAvailable": 50}
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """Fake monotonic clock, advanced by hand, and a fake /proc/meminfo."""
+    class Clock:
+        now = 1000.0
+        meminfo = dict(PLENTY_OF_MEMORY)
+
+    monkeypatch.setattr(nch.time, "monotonic", lambda: Clock.now)
+    monkeypatch.setattr(nch, "read_meminfo", lambda: Clock.meminfo)
+    return Clock
+
+
+def run_window(tuner, clock, mb_per_second):
+    """Complete one full measurement window at the given throughput; returns the logged reason."""
+    clock.now += nch.TUNER_WINDOW_SECONDS
+    tuner.record(tuner.concurrency, mb_per_second * 1e6 * nch.TUNER_WINDOW_SECONDS)
+    return tuner.log[-1][-1]
+
+
+def test_climbs_while_throughput_rises_and_turns_around(clock):
+    tuner = nch.ConcurrencyTuner(maximum=8, start=2)
+    assert run_window(tuner, clock, 100) == "first window"
+    assert tuner.concurrency == 3
+    assert run_window(tuner, clock, 150) == "throughput up"
+    assert tuner.concurrency == 4
+    assert run_window(tuner, clock, 120) == "throughput down"
+    assert tuner.concurrency == 3
+    assert run_window(tuner, clock, 121) == "throughput flat"
+    assert tuner.concurrency == 3
+    measured = [entry[1] for entry in tuner.log]
+    assert measured == [2, 3, 4, 3]
+
+
+def test_waits_for_a_full_window(clock):
+    tuner = nch.ConcurrencyTuner(maximum=8, start=4)
+    clock.now += nch.TUNER_WINDOW_SECONDS / 2
+    tuner.record(1, 10 ** 6)
+    # Long enough, but fewer completions than tasks in flight
+    clock.now += nch.TUNER_WINDOW_SECONDS
+    tuner.record(2, 10 ** 6)
+    assert tuner.log == []
+    tuner.record(1, 10 ** 6)
+    assert len(tuner.log) == 1
+
+
+def test_memory_pressure_steps_down(clock):
+    tuner = nch.ConcurrencyTuner(maximum=8, start=4)
+    clock.meminfo = {"MemTotal": 100, "MemAvailable": 5}
+    assert run_window(tuner, clock, 100) == "memory pressure"
+    assert tuner.concurrency == 3
+
+
+def test_bounds(clock):
+    tuner = nch.ConcurrencyTuner(maximum=3, start=10)
+    assert tuner.concurrency == 3
+    run_window(tuner, clock, 100)
+    # Pinned at the maximum: the next gain explores downwards
+    assert tuner.concurrency == 3
+    run_window(tuner, clock, 200)
+    assert tuner.concurrency == 2
+
+    tuner = nch.ConcurrencyTuner(maximum=4, start=1)
+    clock.meminfo = {"MemTotal": 100, "MemAvailable": 1}
+    run_window(tuner, clock, 100)
+    assert tuner.concurrency == 1
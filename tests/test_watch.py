@@ -0,0 +1,68 @@
+import time
+
+import pytest
+
+import niwrap_correct_headers as nch
+
+DEBOUNCE = 10.0
+
+
+@pytest.fixture
+def later(monkeypatch):
+    """Call later(seconds) to make the watcher see the time that many seconds from now."""
+    real_time = time.time
+
+    def advance(seconds):
+        monkeypatch.setattr(nch.time, "time", lambda: real_time() + seconds)
+
+    return advance
+
+
+@pytest.fixture
+def watcher(tmp_path):
+    watcher = nch.DatasetWatcher(str(tmp_path))
+    yield watcher
+    watcher.close()
+
+
+def write(path, content=b"scan"):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_bytes(content)
+    return str(path)
+
+
+def test_files_are_reported_once_settled(watcher, tmp_path, later):
+    path = write(tmp_path / "sub-01" / "anat" / "sub-01_T1w.nii.gz")
+    write(tmp_path / "sub-01" / "anat" / "sub-01_bold.nii.gz")
+    written = time.time()
+    assert watcher.changes(0, DEBOUNCE) == {}
+
+    later(DEBOUNCE + 1)
+    settled = watcher.changes(0, DEBOUNCE)
+    assert list(settled) == [path]
+    # Arrival is when the file was written, not when it settled
+    assert abs(settled[path] - written) < 5
+
+
+def test_marked_files_return_only_when_changed(watcher, tmp_path, later):
+    path = write(tmp_path / "sub-01_T1w.nii.gz")
+    later(DEBOUNCE + 1)
+    assert list(watcher.changes(0, DEBOUNCE)) == [path]
+    watcher.mark(path)
+    assert watcher.changes(0, DEBOUNCE) == {}
+
+    write(tmp_path / "sub-01_T1w.nii.gz", b"rewritten scan")
+    later(0)
+    assert watcher.changes(0, DEBOUNCE) == {}
+    later(DEBOUNCE + 1)
+    assert list(watcher.changes(0, DEBOUNCE)) == [path]
+
+
+def test_files_removed_before_settling_are_dropped(watcher, tmp_path, later):
+    path = tmp_path / "sub-01_T1w.nii.gz"
+    write(path)
+    assert watcher.changes(0, DEBOUNCE) == {}
+    path.unlink()
+    later(DEBOUNCE + 1)
+    assert watcher.changes(0, DEBOUNCE) == {}
+    assert watcher.pending == set()